@@ -0,0 +1,207 @@
+"""
+Fleet-scale load test: N query accounts through ``launcher.run_tasks_query`` against the mock server.
+
+    python -m benchmarks.fleet --accounts 10 100 1000 --duration 120
+    python -m benchmarks.fleet --accounts 500 --workers 500 --latency 0.2 --error-rate 0.02
+
+The mock server runs in this process and every fleet size runs in a fresh child process pointed at it,
+so memory and event-loop lag are measured for the bot alone. Per fleet size it reports paints/s (as
+counted by the server), p50/p99 latency of game API and asset requests, event-loop lag, peak RSS per
+account and time to first paint.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Unlimited fleet-wide rate limits, so the harness finds where the process itself gives out.
+UNLIMITED = json.dumps({family: [0, 1] for family in ("repaint", "status", "template", "tasks")})
+
+
+def make_query(index: int) -> str:
+    user = json.dumps({"id": 10_000_000 + index, "first_name": "Load", "username": f"load{index:05d}"},
+                      separators=(",", ":"))
+    return f"user={quote(user)}&chat_instance=-1&chat_type=sender&auth_date={int(time.time())}&hash={index:064x}"
+
+
+def current_rss() -> int:
+    with open("/proc/self/statm") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+async def watch_loop_lag(samples: list[float], interval: float = 0.1) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(loop.time() - started - interval)
+
+
+async def run_child(accounts: int, duration: float, result_path: str) -> None:
+    # Imported here: settings are read from the environment the parent prepared.
+    from bot.core.http_client import AsyncSession
+    from bot.core.metrics import fleet_metrics, percentile
+    from bot.utils import logger
+    from bot.utils import launcher
+
+    logger.remove()
+    latencies: list[float] = []
+    request = AsyncSession._request
+
+    async def timed_request(self, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await request(self, method, url, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    AsyncSession._request = timed_request
+
+    lag: list[float] = []
+    rss_before = current_rss()
+    watcher = asyncio.create_task(watch_loop_lag(lag))
+    fleet = asyncio.create_task(launcher.run_tasks_query([make_query(index) for index in range(accounts)]))
+    started = time.monotonic()
+    try:
+        await asyncio.wait_for(asyncio.shield(fleet), duration)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.monotonic() - started
+    fleet.cancel()
+    watcher.cancel()
+    await asyncio.gather(fleet, watcher, return_exceptions=True)
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    ttfp = fleet_metrics.stats()
+    with open(result_path, "w") as file:
+        json.dump({
+            "elapsed": elapsed,
+            "requests": len(latencies),
+            "latency_p50": percentile(latencies, 0.5),
+            "latency_p99": percentile(latencies, 0.99),
+            "loop_lag_p99": percentile(lag, 0.99),
+            "loop_lag_max": max(lag, default=0.0),
+            "rss_base": rss_before,
+            "rss_peak": peak_rss,
+            "rss_per_account": max(0, peak_rss - rss_before) / accounts,
+            "painted_accounts": ttfp["painted"],
+            "ttfp_p50": ttfp["ttfp_p50"],
+            "ttfp_p90": ttfp["ttfp_p90"],
+        }, file)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_size(args, accounts: int, base_url: str, state) -> dict:
+    from bot.mock import endpoint_settings
+
+    workdir = tempfile.mkdtemp(prefix="notpixel-fleet-")
+    os.makedirs(os.path.join(workdir, "cache"))
+    result_path = os.path.join(workdir, "result.json")
+    env = dict(os.environ, PYTHONPATH=ROOT, **endpoint_settings(base_url),
+               USE_NEW_PAINT_METHOD="true", USE_PROXY_FROM_FILE="false", NIGHT_MODE="false",
+               STATS_INTERVAL="100000", STARTUP_WORKERS=str(args.startup_workers), RATE_LIMITS=args.rate_limits)
+    if args.workers:
+        env["SCHEDULER_WORKERS"] = str(args.workers)
+
+    paints_before = state.paints
+    errors_before = state.errors
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "benchmarks.fleet", "--child", "--accounts", str(accounts),
+        "--duration", str(args.duration), "--result", result_path, cwd=workdir, env=env,
+        stdout=None if args.verbose else asyncio.subprocess.DEVNULL,
+        stderr=None if args.verbose else asyncio.subprocess.DEVNULL)
+    try:
+        await process.wait()
+        if process.returncode:
+            raise RuntimeError(f"fleet of {accounts} exited with {process.returncode}, rerun with --verbose")
+        with open(result_path) as file:
+            result = json.load(file)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    result.update(accounts=accounts, paints=state.paints - paints_before, injected_errors=state.errors - errors_before)
+    result["paints_per_second"] = result["paints"] / result["elapsed"]
+    return result
+
+
+def print_row(result: dict | None = None) -> None:
+    if result is None:
+        print(f"{'accounts':>8}{'paints/s':>10}{'req p50':>10}{'req p99':>10}{'lag p99':>10}{'lag max':>10}"
+              f"{'RSS/acct':>10}{'TTFP p50':>10}{'TTFP p90':>10}{'painted':>9}")
+        return
+    print(f"{result['accounts']:>8}{result['paints_per_second']:>10.2f}"
+          f"{result['latency_p50'] * 1000:>8.0f}ms{result['latency_p99'] * 1000:>8.0f}ms"
+          f"{result['loop_lag_p99'] * 1000:>8.0f}ms{result['loop_lag_max'] * 1000:>8.0f}ms"
+          f"{result['rss_per_account'] / 1024:>8.0f}KB{result['ttfp_p50']:>9.1f}s{result['ttfp_p90']:>9.1f}s"
+          f"{result['painted_accounts']:>9}")
+
+
+async def run_parent(args) -> None:
+    from bot.mock import MockConfig, start
+    from bot.utils import logger
+
+    logger.remove()
+    # Requests cut off when a fleet is stopped are expected, not server errors.
+    logging.getLogger("aiohttp.server").setLevel(logging.CRITICAL)
+    port = args.port or free_port()
+    config = MockConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                        max_charges=args.max_charges, recharge_seconds=args.recharge_seconds)
+    runner = await start(config, "127.0.0.1", port)
+    state = runner.app["state"]
+    results = []
+    try:
+        print_row()
+        for accounts in args.accounts:
+            result = await run_size(args, accounts, f"http://127.0.0.1:{port}", state)
+            results.append(result)
+            print_row(result)
+    finally:
+        await runner.cleanup()
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"python": sys.version.split()[0], "duration": args.duration, "workers": args.workers,
+                       "mock": vars(config), "results": results}, file, indent=2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.fleet", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--accounts", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--duration", type=float, default=120, help="Seconds each fleet size runs")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="SCHEDULER_WORKERS for the fleet (default: the bot's default)")
+    parser.add_argument("--startup-workers", type=int, default=20)
+    parser.add_argument("--rate-limits", default=UNLIMITED, help="RATE_LIMITS for the fleet (default: unlimited)")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-charges", type=int, default=24)
+    parser.add_argument("--recharge-seconds", type=float, default=10)
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show the bot's own output and tracebacks")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(run_child(args.accounts[0], args.duration, args.result))
+    else:
+        asyncio.run(run_parent(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Micro-benchmarks for the per-pixel paint path.
+
+    python -m benchmarks.paint_path                        # print a table
+    python -m benchmarks.paint_path --save base.json       # also store the results
+    python -m benchmarks.paint_path --compare base.json    # change against stored results
+
+Every case is timed with ``time.perf_counter`` over ``--repeat`` rounds of a calibrated number of
+calls; the median per-call time is the number to compare between runs.
+"""
+import argparse
+import asyncio
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+from urllib.parse import quote
+
+import numpy as np
+from PIL import Image
+
+from bot.core.allocator import PixelAllocator
+from bot.core.canvas import CANVAS_SIZE, PALETTE, PALETTE_RGB, Canvas, TemplateGrid
+from bot.core.http_client import Response
+from bot.core.scheduler import charge_aware_delay
+from bot.utils.accounts import fetch_username
+from bot.utils import logger
+from bot.utils.ps import apis, baseUrl, parse_main_js_format, scan_bundle
+
+TEMPLATE_SIZE = 510
+
+
+def template_png(size: int = TEMPLATE_SIZE, seed: int = 0) -> bytes:
+    # Blocky palette image with a transparent border, like the catalog templates.
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, len(PALETTE), (size // 6 + 1, size // 6 + 1)).repeat(6, 0).repeat(6, 1)[:size, :size]
+    rgba = np.dstack([PALETTE_RGB[indices], np.full((size, size), 255)]).astype(np.uint8)
+    rgba[:8, :, 3] = 0
+    buffer = io.BytesIO()
+    Image.fromarray(rgba, "RGBA").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def bundle_text(size: int = 1024 * 1024) -> str:
+    # Minified-looking filler with the base URL and the endpoints half way through.
+    filler = 'function a(e){return e.map(t=>t*2).filter(Boolean)}var o={k:"v",n:1};'
+    half = filler * (size // len(filler) // 2)
+    calls = "".join(f'e.get("{api}");' for api in apis)
+    return f'{half}const Ne="{baseUrl}";{calls}{half}'
+
+
+class StreamedBundle:
+    """Just enough of an aiohttp response for ``scan_bundle``."""
+
+    charset = "utf-8"
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.content = self
+
+    async def iter_chunked(self, size: int):
+        for start in range(0, len(self.body), size):
+            yield self.body[start:start + size]
+
+
+def init_data(user_id: int = 123456789) -> str:
+    user = json.dumps({"id": user_id, "first_name": "Bench", "last_name": "", "username": "bench_user",
+                       "language_code": "en", "allows_write_to_pm": True}, separators=(",", ":"))
+    return f"user={quote(user)}&chat_instance=-123456789&chat_type=sender&auth_date=1729000000&hash={'a' * 64}"
+
+
+def status_payload() -> bytes:
+    return json.dumps({
+        "coins": 12.3456, "speedPerSecond": 0.0014, "fromStart": 3120, "toStart": 0, "claimed": 0,
+        "boosts": {"energyLimit": 3, "paintReward": 4, "reChargeSpeed": 5}, "repaintsTotal": 1234,
+        "userBalance": 5678.9, "activated": True, "league": "gold", "charges": 7, "maxCharges": 12,
+        "reChargeTimer": 183000, "reChargeSpeed": 300000, "goods": {"7": 1},
+        "tasks": {f"task{i}": True for i in range(20)}, "maxMiningTime": 28800,
+    }).encode()
+
+
+def cases() -> dict:
+    png = template_png()
+    image = Image.open(io.BytesIO(png))
+    image.load()
+    grid = TemplateGrid.from_image(image, 244, 244, TEMPLATE_SIZE)
+    canvas = Canvas()
+    canvas.load_indices(np.full((CANVAS_SIZE, CANVAS_SIZE), 11, dtype=np.uint8))
+    allocator = PixelAllocator(lease_ttl=180, batch_size=24)
+    cells = grid.paintable[:24]
+    bundle = bundle_text().encode()
+    loop = asyncio.new_event_loop()
+    html = '<html><head><script type="module" crossorigin src="/assets/index-DCe0Ai0r.js"></script></head></html>'
+    query = init_data()
+    payload = status_payload()
+
+    def decode_template():
+        with Image.open(io.BytesIO(png)) as decoded:
+            decoded.load()
+            TemplateGrid.from_image(decoded, 244, 244, TEMPLATE_SIZE)
+
+    def lease_pixels():
+        allocator.lease("bench", grid, 24, canvas)
+        allocator.release("bench")
+
+    def encode_cells():
+        for flat in cells:
+            grid.cell(flat)
+
+    def scan(full):
+        return lambda: loop.run_until_complete(scan_bundle(StreamedBundle(bundle), full=full))
+
+    def status_json():
+        status = Response(200, "OK", "", {}, payload).json()
+        charge_aware_delay(status)
+
+    return {
+        "template.decode": decode_template,
+        "template.grid": lambda: TemplateGrid.from_image(image, 244, 244, TEMPLATE_SIZE),
+        "paint.diff": lambda: canvas.diff(grid, limit=24),
+        "paint.lease": lease_pixels,
+        "paint.encode_24_cells": encode_cells,
+        "query.fetch_username": lambda: fetch_username(query),
+        "bundle.main_js_format": lambda: parse_main_js_format(html),
+        "bundle.scan_1mb": scan(True),
+        "bundle.scan_1mb_early": scan(False),
+        "status.json": status_json,
+    }
+
+
+def measure(func, repeat: int, min_time: float) -> dict:
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / repeat:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / repeat / elapsed) + 1))
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started) / number)
+    return {"number": number, "median": statistics.median(timings), "min": min(timings)}
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.paint_path", description=__doc__.split("\n\n")[0])
+    parser.add_argument("-k", "--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds spent timing each case")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=10, help="Slowdown in %% reported as a regression")
+    args = parser.parse_args()
+    # fetch_username and the scanner log; keep the table readable.
+    logger.remove()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+
+    results = {}
+    regressions = 0
+    print(f"{'case':<24}{'calls':>10}{'median':>12}{'min':>12}{'ops/s':>12}{'change':>10}")
+    for name, func in cases().items():
+        if args.filter not in name:
+            continue
+        result = results[name] = measure(func, args.repeat, args.min_time)
+        change = ""
+        if name in baseline:
+            delta = (result["median"] / baseline[name]["median"] - 1) * 100
+            change = f"{delta:+.1f}%"
+            if delta > args.threshold:
+                change += " !"
+                regressions += 1
+        print(f"{name:<24}{result['number']:>10}{format_time(result['median']):>12}"
+              f"{format_time(result['min']):>12}{1 / result['median']:>12.0f}{change:>10}")
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"python": sys.version.split()[0], "platform": platform.platform(),
+                       "numpy": np.__version__, "results": results}, file, indent=2)
+    if regressions:
+        print(f"{regressions} case(s) slower than the baseline by more than {args.threshold:g}%")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -17,22 +17,49 @@ class Settings(BaseSettings):
     USE_PUMPKIN_BOMBS: bool = True
 
     USE_NEW_PAINT_METHOD: bool = False
+    USE_LOCAL_PIXEL_PROVIDER: bool = False
     USE_CUSTOM_TEMPLATE: bool = True
     CUSTOM_TEMPLATE_ID: int = 1006282664
     USE_RANDOM_TEMPLATES: bool = False
     RANDOM_TEMPLATES_ID: list[int] = [6493211155, 6989019093, 917981974, 7319890725, 799818229, 1972552043, 7114665280, 5323541038, 1964161795, 5522474073,
                                       6578955397, 737065053, 347622105, 446378180, 379402843, 6914611412, 1325258259, 175225616, 2107125948, 1811879982, 5465341011, 1678134459]
+    TEMPLATE_CACHE_SIZE: int = 16
+    TEMPLATE_CACHE_MAX_MB: int = 64
+    CANVAS_SNAPSHOT_INTERVAL: int = 300
+    PIXEL_LEASE_BATCH: int = 10
+    PIXEL_LEASE_TTL: int = 180
 
     NIGHT_MODE: bool = False
     SLEEP_TIME: list[int] = [0, 7] # your time zone
 
     DELAY_EACH_ACCOUNT: list[int] = [10,15]
     SLEEP_TIME_BETWEEN_EACH_ROUND: list[int] = [1000, 1500]
+    WAKEUP_MODE: str = "fixed"
+    TOKEN_LIFETIME: list[int] = [1000, 1500]
+    TG_CONNECT_CONCURRENCY: int = 10
 
     ADVANCED_ANTI_DETECTION: bool = True
+    VERSION_CHECK_INTERVAL: int = 300
 
     USE_PROXY_FROM_FILE: bool = False
 
+    HTTP_POOL_LIMIT: int = 200
+    HTTP_POOL_LIMIT_PER_HOST: int = 20
+    STATS_INTERVAL: int = 600
+    ADAPTIVE_CONCURRENCY: bool = True
+    API_CONCURRENCY: list[int] = [20, 2, 200]
+    API_LATENCY_TARGET: float = 5
+    RATE_LIMITS: dict[str, list[float]] = {}
+    STARTUP_WORKERS: int = 20
+    SCHEDULER_WORKERS: int = 50
+    SCHEDULER_MAX_ROUNDS: int = 1000
+
+    API_GAME_ENDPOINT: str = "https://notpx.app/api/v1"
+    APP_ENDPOINT: str = "https://app.notpx.app"
+    IMAGE_ENDPOINT: str = "https://image.notpx.app"
+    PIXEL_SERVER_ENDPOINT: str = "https://62.60.156.241"
+    ANALYTICS_ENDPOINT: str = "https://plausible.joincommunity.xyz"
+
     BOT_TOKEN: str = ""
 
 
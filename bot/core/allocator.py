@@ -0,0 +1,130 @@
+import random
+import time
+from collections import deque
+
+from bot.config import settings
+from bot.core.canvas import Canvas, TemplateGrid
+from bot.utils import logger
+
+
+class PixelAllocator:
+    """
+    Hands out distinct target pixels to the accounts running in this process.
+
+    A Tapper leases a small batch of ``(pixelId, color)`` before painting. A pixel leased to one
+    account is not given to another until it is painted, released, or its lease expires after
+    ``lease_ttl`` seconds (covers accounts that crash or stop mid-batch). Batches come from the
+    canvas diff when a snapshot is loaded, so mismatched pixels are shared out first. They are
+    topped up with random template cells, skipping ones another account painted recently, when there
+    is nothing left to fix.
+
+    ``collision_rate`` is the share of paints that hit a pixel another account painted within the
+    last ``lease_ttl`` seconds. ``avoided`` counts candidates skipped because another account
+    already held them, i.e. the collisions the allocator prevented.
+    """
+
+    def __init__(self, lease_ttl: float = 180, batch_size: int = 10):
+        self.lease_ttl = lease_ttl
+        self.batch_size = batch_size
+        self._leases: dict[int, tuple[str, float]] = {}
+        self._owned: dict[str, set[int]] = {}
+        self._recent: dict[int, tuple[str, float]] = {}
+        self._recent_order: deque[tuple[float, int]] = deque()
+        self.leased = 0
+        self.painted = 0
+        self.collisions = 0
+        self.avoided = 0
+        self.expired = 0
+
+    @property
+    def active_leases(self) -> int:
+        return len(self._leases)
+
+    @property
+    def collision_rate(self) -> float:
+        return self.collisions / self.painted if self.painted else 0.0
+
+    def lease(self, owner: str, grid: TemplateGrid, count: int | None = None,
+              canvas: Canvas | None = None) -> deque[tuple[int, str]]:
+        """Lease up to ``count`` (default ``batch_size``) pixels of ``grid`` that no other account holds."""
+        now = time.time()
+        count = self.batch_size if count is None else count
+        self._expire(now)
+        self.release(owner)
+
+        batch = deque()
+        owned = self._owned.setdefault(owner, set())
+        if canvas is not None and canvas.loaded:
+            # Over-fetch by the number of live leases so held pixels can be skipped.
+            self._take(owner, canvas.diff(grid, limit=count + len(self._leases)), count, batch, owned, now)
+        if len(batch) < count and len(grid.paintable):
+            sample = min(len(grid.paintable), (count - len(batch)) * 2 + len(self._leases))
+            cells = (grid.cell(grid.paintable[i]) for i in random.sample(range(len(grid.paintable)), sample))
+            self._take(owner, cells, count, batch, owned, now, skip_recent=True)
+        return batch
+
+    def _take(self, owner, candidates, count, batch, owned, now, skip_recent=False) -> None:
+        expires = now + self.lease_ttl
+        for pixel, color in candidates:
+            if len(batch) >= count:
+                return
+            if pixel in owned:
+                continue
+            recent = self._recent.get(pixel) if skip_recent else None
+            if pixel in self._leases or (recent is not None and recent[0] != owner):
+                self.avoided += 1
+                continue
+            self._leases[pixel] = (owner, expires)
+            owned.add(pixel)
+            batch.append((pixel, color))
+            self.leased += 1
+
+    def mark_painted(self, owner: str, pixel: int) -> None:
+        now = time.time()
+        if self._leases.pop(pixel, None) is not None:
+            self._owned.get(owner, set()).discard(pixel)
+        previous = self._recent.get(pixel)
+        if previous is not None and previous[0] != owner and now - previous[1] < self.lease_ttl:
+            self.collisions += 1
+        self.painted += 1
+        self._recent[pixel] = (owner, now)
+        self._recent_order.append((now, pixel))
+
+    def release(self, owner: str) -> None:
+        """Give back every pixel ``owner`` leased but did not paint."""
+        for pixel in self._owned.pop(owner, ()):
+            lease = self._leases.get(pixel)
+            if lease is not None and lease[0] == owner:
+                del self._leases[pixel]
+
+    def _expire(self, now: float) -> None:
+        for pixel, (owner, expires) in list(self._leases.items()):
+            if expires <= now:
+                del self._leases[pixel]
+                self._owned.get(owner, set()).discard(pixel)
+                self.expired += 1
+        while self._recent_order and now - self._recent_order[0][0] >= self.lease_ttl:
+            _, pixel = self._recent_order.popleft()
+            recent = self._recent.get(pixel)
+            if recent is not None and now - recent[1] >= self.lease_ttl:
+                del self._recent[pixel]
+
+    def stats(self) -> dict:
+        return {
+            "leased": self.leased,
+            "painted": self.painted,
+            "collisions": self.collisions,
+            "collision_rate": round(self.collision_rate, 4),
+            "avoided": self.avoided,
+            "expired": self.expired,
+            "active_leases": self.active_leases,
+        }
+
+    def log_stats(self) -> None:
+        logger.info(f"Allocator | painted: <cyan>{self.painted}</cyan> | "
+                    f"collisions: <yellow>{self.collisions}</yellow> ({self.collision_rate:.2%}) | "
+                    f"avoided: <green>{self.avoided}</green> | expired leases: {self.expired} | "
+                    f"active leases: {self.active_leases}")
+
+
+allocator = PixelAllocator(lease_ttl=settings.PIXEL_LEASE_TTL, batch_size=settings.PIXEL_LEASE_BATCH)
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from pyrogram.raw import types as raw_types
+
+from bot.config import settings
+from bot.exceptions import InvalidSession
+from bot.utils import logger
+
+
+class PeerCache:
+    """
+    Resolved bot peer per session, persisted as JSON so restarts skip ``resolve_peer`` entirely.
+
+    Entries are only dropped when a call using them fails.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._peers: dict[str, object] = {}
+        try:
+            with open(path, "r") as file:
+                for session_name, data in json.load(file).items():
+                    self._peers[session_name] = getattr(raw_types, data.pop("type"))(**data)
+        except (FileNotFoundError, ValueError, TypeError, AttributeError, KeyError):
+            self._peers = {}
+
+    def get(self, session_name: str):
+        return self._peers.get(session_name)
+
+    def __setitem__(self, session_name: str, peer) -> None:
+        self._peers[session_name] = peer
+        self._save()
+
+    def pop(self, session_name: str, default=None):
+        peer = self._peers.pop(session_name, default)
+        if peer is not default:
+            self._save()
+        return peer
+
+    def __len__(self) -> int:
+        return len(self._peers)
+
+    def _save(self) -> None:
+        data = {session_name: {"type": type(peer).__name__, **{key: getattr(peer, key) for key in peer.__slots__}}
+                for session_name, peer in self._peers.items()}
+        try:
+            with open(f"{self.path}.tmp", "w") as file:
+                json.dump(data, file)
+            os.replace(f"{self.path}.tmp", self.path)
+        except OSError as error:
+            logger.warning(f"Error saving resolved peers: {error}")
+
+
+@dataclass
+class Token:
+    init_data: str
+    created_at: float
+    expires_at: float
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+
+class TokenManager:
+    """
+    Process-wide cache of Telegram ``initData`` per session.
+
+    A token is fetched once, reused until it expires and refreshed in the background ``refresh_ahead``
+    seconds before that while its Tapper is running, so accounts rarely wait on Telegram. Between rounds
+    nothing runs in the background; the scheduler asks :meth:`refresh_in` when to renew the token so a
+    fresh one is ready by the next round. Concurrent
+    requests for the same session share one fetch, at most ``max_connects`` pyrogram connects run at
+    once, and the resolved bot peer is kept per session in ``peers`` (see :class:`PeerCache`).
+    """
+
+    def __init__(self, lifetime: tuple[int, int] = (1000, 1500), refresh_ahead: float = 120,
+                 max_connects: int = 10, peers: PeerCache | None = None):
+        self.lifetime = lifetime
+        self.refresh_ahead = refresh_ahead
+        self.connects = asyncio.Semaphore(max_connects)
+        self.peers = peers if peers is not None else PeerCache(os.path.join("sessions", "peers.json"))
+        self._tokens: dict[str, Token] = {}
+        self._pending: dict[str, asyncio.Future] = {}
+        self._refreshers: dict[str, asyncio.Task] = {}
+        self._fetchers: dict[str, Callable[[], Awaitable[str | None]]] = {}
+        self.hits = 0
+        self.fetches = 0
+
+    async def get(self, session_name: str, fetch: Callable[[], Awaitable[str | None]]) -> str | None:
+        """Cached ``initData`` for ``session_name``, calling ``fetch`` only when it is missing or expired."""
+        self._fetchers[session_name] = fetch
+        token = self._tokens.get(session_name)
+        if token is not None and not token.expired:
+            self.hits += 1
+            if session_name not in self._refreshers:
+                self._schedule(session_name, fetch, token)
+            return token.init_data
+        return await self.refresh(session_name, fetch)
+
+    async def refresh(self, session_name: str, fetch: Callable[[], Awaitable[str | None]] | None = None) -> str | None:
+        """Fetch a new token now, with ``fetch`` or the one last passed to :meth:`get`."""
+        fetch = fetch or self._fetchers[session_name]
+        pending = self._pending.get(session_name)
+        if pending is None:
+            pending = self._pending[session_name] = asyncio.ensure_future(self._fetch(session_name, fetch))
+        return await asyncio.shield(pending)
+
+    async def _fetch(self, session_name: str, fetch) -> str | None:
+        try:
+            async with self.connects:
+                init_data = await fetch()
+            self.fetches += 1
+            if not init_data:
+                return None
+            now = time.time()
+            token = self._tokens[session_name] = Token(init_data, now, now + random.randint(*self.lifetime))
+            self._schedule(session_name, fetch, token)
+            return init_data
+        finally:
+            del self._pending[session_name]
+
+    def _schedule(self, session_name: str, fetch, token: Token) -> None:
+        task = self._refreshers.get(session_name)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        self._refreshers[session_name] = asyncio.create_task(self._refresh_later(session_name, fetch, token))
+
+    async def _refresh_later(self, session_name: str, fetch, token: Token) -> None:
+        await asyncio.sleep(max(0.0, token.expires_at - self.refresh_ahead - time.time()))
+        try:
+            await self.refresh(session_name, fetch)
+        except (Exception, InvalidSession) as error:
+            # The Tapper sees InvalidSession again on its next get().
+            self._tokens.pop(session_name, None)
+            self._refreshers.pop(session_name, None)
+            logger.warning(f"{session_name} | Background token refresh failed: {error!r}")
+
+    def refresh_in(self, session_name: str, delay: float) -> float | None:
+        """
+        Seconds from now to refresh ``session_name`` so a token is valid for a round due in ``delay``
+        seconds, or None when the cached token lasts until then (or there is nothing to refresh).
+        """
+        token = self._tokens.get(session_name)
+        if token is None or session_name not in self._fetchers:
+            return None
+        if token.expires_at - self.refresh_ahead >= time.time() + delay:
+            return None
+        return max(0.0, delay - self.refresh_ahead)
+
+    def release(self, session_name: str) -> None:
+        """Stop refreshing ``session_name`` in the background; its current token stays cached."""
+        task = self._refreshers.pop(session_name, None)
+        if task is not None:
+            task.cancel()
+
+    def invalidate(self, session_name: str) -> None:
+        self.release(session_name)
+        self._tokens.pop(session_name, None)
+        self._fetchers.pop(session_name, None)
+
+    def log_stats(self) -> None:
+        logger.info(f"Tokens | cached: <cyan>{len(self._tokens)}</cyan> | refreshing: "
+                    f"<cyan>{len(self._refreshers)}</cyan> | peers: <cyan>{len(self.peers)}</cyan> | hits: <cyan>{self.hits}</cyan> | "
+                    f"Telegram fetches: <cyan>{self.fetches}</cyan>")
+
+
+token_manager = TokenManager(lifetime=tuple(settings.TOKEN_LIFETIME), max_connects=settings.TG_CONNECT_CONCURRENCY)
@@ -0,0 +1,281 @@
+import asyncio
+import io
+import random
+import time
+import weakref
+from collections import deque
+
+import numpy as np
+from PIL import Image
+
+from bot.config import settings
+from bot.utils import logger
+
+CANVAS_SIZE = 1000
+CANVAS_SNAPSHOT_URL = f"{settings.IMAGE_ENDPOINT}/api/v2/image"
+
+PALETTE = ["#FFD635", "#7EED56", "#00CCC0", "#51E9F4", "#94B3FF", "#000000", "#898D90", "#E46E6E",
+           "#E4ABFF", "#FF99AA", "#FFB470", "#FFFFFF", "#BE0039", "#FF9600", "#00CC78", "#009EAA",
+           "#3690EA", "#6A5CFF", "#B44AC0", "#FF3881", "#9C6926", "#6D001A", "#BF4300", "#00A368",
+           "#00756F", "#2450A4", "#493AC1", "#811E9F", "#A00357", "#6D482F"]
+PALETTE_RGB = np.array([[int(color[i:i + 2], 16) for i in (1, 3, 5)] for color in PALETTE], dtype=np.int32)
+PALETTE_INDEX = {color: index for index, color in enumerate(PALETTE)}
+
+# Palette index used for template cells that must not be painted (transparent pixels).
+TRANSPARENT = 255
+# Palette index used for canvas pixels whose color is not known locally.
+UNKNOWN = 254
+
+
+def pixel_id(x: int, y: int) -> int:
+    return y * CANVAS_SIZE + x + 1
+
+
+def pixel_xy(pixel: int) -> tuple[int, int]:
+    y, x = divmod(pixel - 1, CANVAS_SIZE)
+    return x, y
+
+
+def to_palette_indices(image: Image.Image) -> np.ndarray:
+    """
+    Map every pixel of ``image`` to the index of the nearest ``PALETTE`` color (squared RGB distance).
+
+    Distances are computed once per distinct color rather than once per pixel, so a 510x510 template
+    costs a single ``np.unique`` pass. Fully transparent pixels map to ``TRANSPARENT``.
+    """
+    rgba = np.asarray(image.convert("RGBA"), dtype=np.uint8)
+    packed = (rgba[..., 0].astype(np.int32) << 16) | (rgba[..., 1].astype(np.int32) << 8) | rgba[..., 2]
+    colors, inverse = np.unique(packed, return_inverse=True)
+    rgb = np.stack([(colors >> 16) & 0xFF, (colors >> 8) & 0xFF, colors & 0xFF], axis=1)
+    distances = ((rgb[:, None, :] - PALETTE_RGB[None, :, :]) ** 2).sum(axis=2)
+    indices = distances.argmin(axis=1).astype(np.uint8)[inverse].reshape(packed.shape)
+    indices[rgba[..., 3] == 0] = TRANSPARENT
+    return indices
+
+
+class TemplateGrid:
+    """
+    Palette-indexed view of a template placed on the canvas.
+
+    ``indices[dy, dx]`` is the ``PALETTE`` index wanted at template cell ``(dx, dy)`` and
+    ``pixel_ids[dy, dx]`` is the canvas ``pixelId`` (``y * 1000 + x + 1``) of that cell, so choosing
+    and encoding a pixel to paint is an array lookup with no PIL calls.
+    """
+
+    __slots__ = ("x", "y", "size", "indices", "pixel_ids", "paintable", "_priority", "__weakref__")
+
+    def __init__(self, indices: np.ndarray, x: int, y: int):
+        height, width = indices.shape
+        # Cells falling outside the canvas can never be painted.
+        height = min(height, CANVAS_SIZE - y)
+        width = min(width, CANVAS_SIZE - x)
+        self.indices = np.ascontiguousarray(indices[:height, :width])
+        self.x = x
+        self.y = y
+        self.size = max(height, width)
+        rows = np.arange(y, y + height, dtype=np.int32)[:, None]
+        cols = np.arange(x, x + width, dtype=np.int32)[None, :]
+        self.pixel_ids = rows * CANVAS_SIZE + cols + 1
+        self.paintable = np.flatnonzero(self.indices != TRANSPARENT)
+        self._priority = None
+
+    @classmethod
+    def from_image(cls, image: Image.Image, x: int, y: int, size: int | None = None) -> "TemplateGrid":
+        if size is not None and (image.width > size or image.height > size):
+            image = image.crop((0, 0, min(size, image.width), min(size, image.height)))
+        return cls(to_palette_indices(image), x, y)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.indices.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.indices.nbytes + self.pixel_ids.nbytes + self.paintable.nbytes
+
+    @property
+    def priority(self) -> np.ndarray:
+        """Per-cell paint priority (lower first): squared distance from the template center."""
+        if self._priority is None:
+            height, width = self.indices.shape
+            dy = np.arange(height, dtype=np.int32)[:, None] - height // 2
+            dx = np.arange(width, dtype=np.int32)[None, :] - width // 2
+            self._priority = (dy * dy + dx * dx).ravel()
+        return self._priority
+
+    def cell(self, flat: int) -> tuple[int, str]:
+        """``(pixelId, hex color)`` for a flat cell index."""
+        return int(self.pixel_ids.flat[flat]), PALETTE[self.indices.flat[flat]]
+
+    def color_at(self, dx: int, dy: int) -> str | None:
+        index = self.indices[dy, dx]
+        return None if index == TRANSPARENT else PALETTE[index]
+
+    def random_pixel(self) -> tuple[int, str] | None:
+        if not len(self.paintable):
+            return None
+        return self.cell(self.paintable[random.randrange(len(self.paintable))])
+
+
+class Canvas:
+    """
+    Local copy of the 1000x1000 canvas as a uint8 array of ``PALETTE`` indices.
+
+    Pixels never observed hold ``UNKNOWN`` and always count as mismatched. ``diff`` compares the
+    canvas with a ``TemplateGrid`` in one vectorized pass and returns only the cells that still need
+    paint, so charges are not spent on pixels that already have the right color.
+
+    Between snapshots the canvas is kept current by ``set_pixel`` (called for every successful
+    repaint), which also keeps the mismatch count of every tracked template up to date in O(1).
+    Loading a snapshot reconciles: it replaces the array, replays local paints newer than the
+    snapshot, and recounts tracked templates.
+    """
+
+    def __init__(self, pixels: np.ndarray | None = None, journal_size: int = 100_000, retry_after: float = 30):
+        if pixels is None:
+            pixels = np.full((CANVAS_SIZE, CANVAS_SIZE), UNKNOWN, dtype=np.uint8)
+        if pixels.shape != (CANVAS_SIZE, CANVAS_SIZE) or pixels.dtype != np.uint8:
+            raise ValueError(f"Canvas expects a {CANVAS_SIZE}x{CANVAS_SIZE} uint8 array, got {pixels.shape} {pixels.dtype}")
+        self.pixels = pixels
+        self.updated_at = 0.0
+        self.failed_at = 0.0
+        self.retry_after = retry_after
+        self.drift = 0
+        self._lock = None
+        self._tracked: weakref.WeakKeyDictionary[TemplateGrid, int] = weakref.WeakKeyDictionary()
+        self._journal: deque[tuple[float, int, int]] = deque(maxlen=journal_size)
+
+    @classmethod
+    def from_image(cls, image: Image.Image) -> "Canvas":
+        canvas = cls()
+        canvas.load_image(image)
+        return canvas
+
+    @property
+    def loaded(self) -> bool:
+        return self.updated_at > 0
+
+    def load_image(self, image: Image.Image) -> None:
+        self.load_indices(to_palette_indices(image))
+
+    def load_indices(self, indices: np.ndarray, taken_at: float | None = None) -> None:
+        """
+        Replace the canvas with a full snapshot requested at ``taken_at``. Local paints recorded after
+        that moment are newer than the snapshot and are replayed on top of it.
+        """
+        taken_at = time.time() if taken_at is None else taken_at
+        height, width = indices.shape
+        pixels = np.full((CANVAS_SIZE, CANVAS_SIZE), UNKNOWN, dtype=np.uint8)
+        pixels[:height, :width] = indices[:CANVAS_SIZE, :CANVAS_SIZE]
+        pixels[pixels == TRANSPARENT] = UNKNOWN
+
+        while self._journal and self._journal[0][0] < taken_at:
+            self._journal.popleft()
+        for _, pixel, index in self._journal:
+            x, y = pixel_xy(pixel)
+            pixels[y, x] = index
+
+        if self.loaded:
+            # Pixels the local model had wrong, i.e. painted by someone outside this process.
+            known = self.pixels != UNKNOWN
+            self.drift = int(np.count_nonzero(known & (self.pixels != pixels)))
+        self.pixels = pixels
+        self.updated_at = taken_at
+        for grid in list(self._tracked.keys()):
+            self._tracked[grid] = self.mismatch_count(grid)
+
+    def get_pixel(self, pixel: int) -> int:
+        x, y = pixel_xy(pixel)
+        return int(self.pixels[y, x])
+
+    def set_pixel(self, pixel: int, color: str | int) -> None:
+        """Record that ``pixel`` now has ``color`` (hex string or palette index)."""
+        index = PALETTE_INDEX.get(color.upper(), UNKNOWN) if isinstance(color, str) else int(color)
+        x, y = pixel_xy(pixel)
+        previous = int(self.pixels[y, x])
+        self._journal.append((time.time(), pixel, index))
+        if previous == index:
+            return
+        for grid, count in list(self._tracked.items()):
+            dx, dy = x - grid.x, y - grid.y
+            height, width = grid.shape
+            if 0 <= dy < height and 0 <= dx < width:
+                wanted = int(grid.indices[dy, dx])
+                if wanted != TRANSPARENT:
+                    self._tracked[grid] = count + (wanted != index) - (wanted != previous)
+        self.pixels[y, x] = index
+
+    def is_mismatched(self, pixel: int, color: str) -> bool:
+        return self.get_pixel(pixel) != PALETTE_INDEX.get(color.upper())
+
+    def track(self, grid: TemplateGrid) -> int:
+        """Start keeping an incremental mismatch count for ``grid`` and return it."""
+        count = self._tracked.get(grid)
+        if count is None:
+            count = self._tracked[grid] = self.mismatch_count(grid)
+        return count
+
+    def mismatches(self, grid: TemplateGrid) -> int:
+        """Mismatched cells of ``grid``; O(1) once the grid is tracked."""
+        return self.track(grid)
+
+    def region(self, grid: TemplateGrid) -> np.ndarray:
+        height, width = grid.shape
+        return self.pixels[grid.y:grid.y + height, grid.x:grid.x + width]
+
+    def mismatched_cells(self, grid: TemplateGrid) -> np.ndarray:
+        """Flat indices of paintable template cells whose canvas color differs from the template."""
+        wanted = grid.indices.ravel()
+        current = self.region(grid).ravel()
+        return np.flatnonzero((wanted != TRANSPARENT) & (wanted != current))
+
+    def mismatch_count(self, grid: TemplateGrid) -> int:
+        return len(self.mismatched_cells(grid))
+
+    def diff(self, grid: TemplateGrid, limit: int | None = None) -> deque[tuple[int, str]]:
+        """
+        Queue of ``(pixelId, hex color)`` for every mismatched template cell, highest priority first
+        (closest to the template center). ``limit`` keeps only the first ``limit`` entries.
+        """
+        cells = self.mismatched_cells(grid)
+        priority = grid.priority[cells]
+        if limit is not None and limit < len(cells):
+            top = np.argpartition(priority, limit)[:limit]
+            cells, priority = cells[top], priority[top]
+        cells = cells[np.argsort(priority, kind="stable")]
+        pixel_ids = grid.pixel_ids.ravel()[cells].tolist()
+        colors = grid.indices.ravel()[cells].tolist()
+        return deque((pixel, PALETTE[color]) for pixel, color in zip(pixel_ids, colors))
+
+    async def refresh(self, session, max_age: float = 300) -> bool:
+        """
+        Reload the canvas snapshot if it is older than ``max_age`` seconds. Concurrent callers share
+        one download, and after a failed one nobody tries again for ``retry_after`` seconds. Returns
+        whether a usable snapshot is loaded.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.loaded and time.time() - self.updated_at < max_age:
+                return True
+            if time.time() - self.failed_at < self.retry_after:
+                return self.loaded
+            try:
+                requested_at = time.time()
+                res = await session.get(CANVAS_SNAPSHOT_URL, headers={'Accept': 'image/webp,image/png,*/*'})
+                res.raise_for_status()
+                indices = await asyncio.to_thread(_decode_snapshot, res.content)
+                self.load_indices(indices, taken_at=requested_at)
+                logger.info(f"Canvas snapshot updated | changed outside this process: <cyan>{self.drift}</cyan> px")
+            except Exception as error:
+                self.failed_at = time.time()
+                logger.warning(f"Failed to load canvas snapshot: {error}")
+            return self.loaded
+
+
+def _decode_snapshot(content: bytes) -> np.ndarray:
+    with Image.open(io.BytesIO(content)) as image:
+        return to_palette_indices(image)
+
+
+canvas = Canvas()
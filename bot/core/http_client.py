@@ -0,0 +1,255 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiocfscrape import CloudflareScraper
+from aiohttp_proxy import ProxyConnector
+
+from bot.core.ratelimit import RateLimiter, rate_limiter
+from bot.exceptions import HTTPError, RequestError
+from bot.utils import logger
+
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=60, sock_connect=15)
+# Safe to send again after a 503: the server may have acted on the first one.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class Response:
+    """
+    Fully-read HTTP response.
+
+    Mirrors the part of the ``requests.Response`` API the bot relies on (``status_code``, ``text``,
+    ``content``, ``json()``, ``raise_for_status()``) so game calls keep their synchronous response
+    handling while the request itself is awaited.
+    """
+
+    __slots__ = ("status_code", "reason", "url", "headers", "content")
+
+    def __init__(self, status_code: int, reason: str, url: str, headers, content: bytes):
+        self.status_code = status_code
+        self.reason = reason or ""
+        self.url = url
+        self.headers = headers
+        self.content = content
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        # Raises json.JSONDecodeError on empty / non-JSON bodies, like requests does.
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if 400 <= self.status_code < 500:
+            kind = "Client Error"
+        elif 500 <= self.status_code < 600:
+            kind = "Server Error"
+        else:
+            return
+        raise HTTPError(f"{self.status_code} {kind}: {self.reason} for url: {self.url}", response=self)
+
+
+class AsyncSession:
+    """
+    Non-blocking HTTP client shared by every call a Tapper makes.
+
+    Requests go through ``CloudflareScraper`` (an ``aiohttp.ClientSession``), so waiting on the
+    server only suspends the calling account instead of the whole event loop. Game API calls take
+    a token from the fleet-wide ``limiter`` first (see :class:`~bot.core.ratelimit.RateLimiter`).
+    """
+
+    def __init__(self, headers: dict | None = None, proxy: str | None = None,
+                 timeout: aiohttp.ClientTimeout = DEFAULT_TIMEOUT, pool: "ConnectionPool | None" = None,
+                 limiter: RateLimiter | None = rate_limiter):
+        self.proxy = proxy
+        self.limiter = limiter
+        if pool is not None:
+            # Borrow the shared keep-alive connector; cookies stay per account.
+            self._client = CloudflareScraper(headers=headers, connector=pool.connector(proxy), connector_owner=False,
+                                             timeout=timeout, trace_configs=[pool.trace_config(proxy)])
+        else:
+            connector = ProxyConnector.from_url(proxy) if proxy else None
+            self._client = CloudflareScraper(headers=headers, connector=connector, timeout=timeout)
+
+    @property
+    def closed(self) -> bool:
+        return self._client.closed
+
+    async def request(self, method: str, url: str, **kwargs) -> Response:
+        bucket = self.limiter.bucket(url) if self.limiter is not None else None
+        if bucket is None:
+            return await self._request(method, url, **kwargs)
+
+        for attempt in range(self.limiter.retries + 1):
+            await bucket.acquire()
+            response = await self._admitted(method, url, **kwargs)
+            delay = self.limiter.observe(bucket, response.status_code, response.headers)
+            if delay is None or attempt == self.limiter.retries:
+                return response
+            if response.status_code != 429 and method.upper() not in IDEMPOTENT_METHODS:
+                return response
+            logger.debug(f"{method} {url} throttled ({response.status_code}), retrying in {delay:.1f}s")
+        return response
+
+    async def _admitted(self, method: str, url: str, **kwargs) -> Response:
+        concurrency = self.limiter.concurrency
+        if concurrency is None:
+            return await self._request(method, url, **kwargs)
+
+        await concurrency.acquire()
+        started = time.monotonic()
+        ok = False
+        try:
+            response = await self._request(method, url, **kwargs)
+            ok = response.status_code not in concurrency.OVERLOAD_STATUSES
+            return response
+        finally:
+            await concurrency.release(time.monotonic() - started, ok)
+
+    async def _request(self, method: str, url: str, **kwargs) -> Response:
+        try:
+            async with self._client.request(method, url, **kwargs) as resp:
+                content = await resp.read()
+                return Response(resp.status, resp.reason, str(resp.url), resp.headers, content)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            raise RequestError(f"{method} {url} failed: {error!r}") from error
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs):
+        """
+        Yield the raw ``aiohttp`` response so large bodies can be read in chunks.
+
+        ``CloudflareScraper`` reads every body to look for challenge pages, so streamed requests go
+        through the plain ``aiohttp`` request path; use it for static assets only.
+        """
+        try:
+            resp = await super(CloudflareScraper, self._client)._request(method, url, **kwargs)
+            try:
+                yield resp
+            finally:
+                resp.release()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            raise RequestError(f"{method} {url} failed: {error!r}") from error
+
+    async def get(self, url: str, **kwargs) -> Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> Response:
+        return await self.request("PUT", url, **kwargs)
+
+    async def close(self) -> None:
+        if not self._client.closed:
+            await self._client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+@dataclass
+class PoolStats:
+    requests: int = 0
+    connections_created: int = 0
+    connections_reused: int = 0
+    queued: int = 0
+
+    @property
+    def reuse_ratio(self) -> float:
+        total = self.connections_created + self.connections_reused
+        return self.connections_reused / total if total else 0.0
+
+
+class ConnectionPool:
+    """
+    Process-wide keep-alive connection pool shared by every account.
+
+    One connector is kept per proxy (``None`` for direct connections); aiohttp pools sockets per host
+    inside it, so connections are effectively keyed by ``(host, proxy)``. ``limit_per_host`` caps the
+    sockets any single host gets through one proxy, and usage is counted per ``(host, proxy)``.
+    """
+
+    def __init__(self, limit: int = 200, limit_per_host: int = 20, keepalive_timeout: float = 60):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._connectors: dict[str | None, aiohttp.TCPConnector] = {}
+        self._trace_configs: dict[str | None, aiohttp.TraceConfig] = {}
+        self._stats: dict[tuple[str, str | None], PoolStats] = {}
+
+    def connector(self, proxy: str | None = None) -> aiohttp.TCPConnector:
+        connector = self._connectors.get(proxy)
+        if connector is None or connector.closed:
+            kwargs = dict(limit=self.limit, limit_per_host=self.limit_per_host,
+                          keepalive_timeout=self.keepalive_timeout, ttl_dns_cache=300)
+            connector = ProxyConnector.from_url(proxy, **kwargs) if proxy else aiohttp.TCPConnector(**kwargs)
+            self._connectors[proxy] = connector
+        return connector
+
+    def session(self, headers: dict | None = None, proxy: str | None = None,
+                timeout: aiohttp.ClientTimeout = DEFAULT_TIMEOUT) -> AsyncSession:
+        return AsyncSession(headers=headers, proxy=proxy, timeout=timeout, pool=self)
+
+    def _host_stats(self, ctx, proxy: str | None) -> PoolStats:
+        return self._stats.setdefault((ctx.host, proxy), PoolStats())
+
+    def trace_config(self, proxy: str | None = None) -> aiohttp.TraceConfig:
+        trace_config = self._trace_configs.get(proxy)
+        if trace_config is not None:
+            return trace_config
+
+        async def on_request_start(session, ctx, params):
+            ctx.host = params.url.host
+            self._host_stats(ctx, proxy).requests += 1
+
+        async def on_connection_queued_start(session, ctx, params):
+            self._host_stats(ctx, proxy).queued += 1
+
+        async def on_connection_create_end(session, ctx, params):
+            self._host_stats(ctx, proxy).connections_created += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            self._host_stats(ctx, proxy).connections_reused += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.freeze()
+        self._trace_configs[proxy] = trace_config
+        return trace_config
+
+    def stats(self) -> dict[tuple[str, str | None], dict]:
+        return {key: dict(asdict(value), reuse_ratio=round(value.reuse_ratio, 3))
+                for key, value in self._stats.items()}
+
+    def log_stats(self) -> None:
+        for (host, proxy), value in sorted(self._stats.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            logger.info(f"Pool | {host} via {_proxy_host(proxy)} | requests: <cyan>{value.requests}</cyan> | "
+                        f"new connections: <yellow>{value.connections_created}</yellow> | "
+                        f"reused: <green>{value.connections_reused}</green> ({value.reuse_ratio:.0%}) | "
+                        f"queued: {value.queued}")
+
+    async def close(self) -> None:
+        for connector in self._connectors.values():
+            await connector.close()
+        self._connectors.clear()
+
+
+def _proxy_host(proxy: str | None) -> str:
+    # Never log proxy credentials.
+    return urlsplit(proxy).hostname if proxy else "direct"
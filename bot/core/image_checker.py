@@ -1,65 +1,191 @@
-import json
 import random
-import requests
-import time
+from collections import deque
+
+import aiohttp
+
+from bot.config import settings
+from bot.exceptions import RequestError, ServiceUnavailable
 from bot.utils import logger
+from bot.core.http_client import AsyncSession
+from bot.core.retry import CircuitBreaker, RetryPolicy
+from bot.core.canvas import TemplateGrid, canvas
+from bot.core.allocator import allocator
+
+
+ENDPOINT = settings.PIXEL_SERVER_ENDPOINT
+
+retry_policy = RetryPolicy("Pixel server", attempts=6, base_delay=2, max_delay=30, deadline=120,
+                           retry_on=(RequestError, ValueError, KeyError),
+                           breaker=CircuitBreaker(threshold=10, reset_timeout=60))
+_session: AsyncSession | None = None
+
+
+def get_session() -> AsyncSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = AsyncSession(timeout=aiohttp.ClientTimeout(total=30, sock_connect=10))
+    return _session
+
+
+async def close_session() -> None:
+    if _session is not None:
+        await _session.close()
+
+
+async def _reachable():
+    response = await get_session().get(f"{ENDPOINT}/is_reacheble/", ssl=False)
+    response.raise_for_status()
+    data = response.json()
+    logger.success(f"Connected to server. Your UUID:{data.get('uuid', None)}")
+    return True
+
+async def reachable():
+    return await retry_policy.call(_reachable)
+
+async def _inform(user_id, balance):
+    response = await get_session().put(f"{ENDPOINT}/info/", json={
+        "user_id": user_id,
+        "balance": balance or 0,
+    }, ssl=False)
+    response.raise_for_status()
+    return response.json()
+
+async def inform(user_id, balance):
+    return await retry_policy.call(_inform, user_id, balance)
+
+async def _get_cords_and_color(user_id, template):
+    response = await get_session().get(f"{ENDPOINT}/get_pixel/?user_id={user_id}&template={template}", ssl=False)
+    response.raise_for_status()
+    return response.json()
+
+async def get_cords_and_color(user_id, template):
+    return await retry_policy.call(_get_cords_and_color, user_id, template)
+
+async def _get_pixel_plan(user_id, template, count):
+    response = await get_session().get(f"{ENDPOINT}/get_pixels/?user_id={user_id}&template={template}&count={count}",
+                                       ssl=False)
+    response.raise_for_status()
+    return [(pixel["coords"], pixel["color"]) for pixel in response.json()]
+
+async def get_pixel_plan(user_id, template, count):
+    return await retry_policy.call(_get_pixel_plan, user_id, template, count)
+
+async def _template_to_join(cur_template=0):
+    response = await get_session().get(f"{ENDPOINT}/get_uncolored/?template={cur_template}", ssl=False)
+    response.raise_for_status()
+    return response.json()['template']
+
+async def template_to_join(cur_template=0):
+    return await retry_policy.call(_template_to_join, cur_template)
+
+
+class RemotePixelProvider:
+    """Pixel coordinator running at ``ENDPOINT``."""
+
+    async def reachable(self):
+        return await reachable()
+
+    async def inform(self, user_id, balance):
+        return await inform(user_id, balance)
+
+    async def template_to_join(self, cur_template=0):
+        return await template_to_join(cur_template)
+
+    async def get_cords_and_color(self, user_id, template):
+        return await get_cords_and_color(user_id, template)
+
+    async def get_plan(self, user_id, template, count):
+        """Up to ``count`` (pixelId, color) pairs in one request, one by one if the server can't batch."""
+        try:
+            return (await get_pixel_plan(user_id, template, count))[:count]
+        except ServiceUnavailable:
+            raise
+        except (RequestError, ValueError, KeyError, TypeError) as error:
+            logger.debug(f"Pixel plan unavailable, asking pixel by pixel: {error}")
+        plan = []
+        for _ in range(count):
+            q = await get_cords_and_color(user_id, template)
+            plan.append((q["coords"], q["color"]))
+        return plan
+
+
+class LocalPixelProvider:
+    """
+    In-process stand-in for the coordinator at ``ENDPOINT``.
+
+    Answers the same calls from the local canvas model, the decoded template grids and
+    the shared pixel allocator, so painting goes on when the remote server is slow or down.
+    Templates become known through :meth:`add_template` once a Tapper has loaded them.
+    """
+
+    def __init__(self, canvas=canvas, allocator=allocator):
+        self.canvas = canvas
+        self.allocator = allocator
+        self._templates: dict[str, TemplateGrid] = {}
+        self._queues: dict[str, tuple[str, deque]] = {}
+
+    def add_template(self, template_id, grid: TemplateGrid) -> None:
+        self._templates[str(template_id)] = grid
+
+    async def reachable(self):
+        return True
+
+    async def inform(self, user_id, balance):
+        return None
+
+    async def template_to_join(self, cur_template=0):
+        """Keep the current template while it has work left, otherwise pick the one with most."""
+        cur_template = str(cur_template or 0)
+        grid = self._templates.get(cur_template)
+        if cur_template != "0" and (grid is None or not self.canvas.loaded or self.canvas.mismatches(grid)):
+            return cur_template
+
+        if self.canvas.loaded and self._templates:
+            left, template_id = max((self.canvas.mismatches(grid), template_id)
+                                    for template_id, grid in self._templates.items())
+            if left:
+                return template_id
+
+        if cur_template != "0":
+            return cur_template
+        if settings.USE_RANDOM_TEMPLATES:
+            return str(random.choice(settings.RANDOM_TEMPLATES_ID))
+        return str(settings.CUSTOM_TEMPLATE_ID)
+
+    async def get_cords_and_color(self, user_id, template):
+        template = str(template)
+        grid = self._templates.get(template)
+        if grid is None:
+            raise LookupError(f"Template {template} is not loaded")
+
+        owner = str(user_id)
+        queued_template, queue = self._queues.get(owner, (None, None))
+        if queued_template != template or not queue:
+            queue = self.allocator.lease(owner, grid, canvas=self.canvas)
+            self._queues[owner] = (template, queue)
+        if not queue:
+            raise LookupError(f"Template {template} has no paintable pixels")
+
+        pixel, color = queue.popleft()
+        return {"coords": pixel, "color": color}
+
+    async def get_plan(self, user_id, template, count):
+        """Lease up to ``count`` (pixelId, color) pairs for one painting round."""
+        template = str(template)
+        grid = self._templates.get(template)
+        if grid is None:
+            raise LookupError(f"Template {template} is not loaded")
+        self._queues.pop(str(user_id), None)
+        return list(self.allocator.lease(str(user_id), grid, count, canvas=self.canvas))
+
+    def release(self, user_id) -> None:
+        self._queues.pop(str(user_id), None)
+        self.allocator.release(str(user_id))
+
+
+remote_provider = RemotePixelProvider()
+local_provider = LocalPixelProvider()
 
 
-ENDPOINT = "https://62.60.156.241"
-def reachable(times_to_fall=20):
-    try:
-     
-        response = requests.get(f"{ENDPOINT}/is_reacheble/", verify=False)
-        if response.status_code == 200:
-            data = response.json()
-            logger.success(f"Connected to server. Your UUID:{data.get('uuid', None)}")
-        response.raise_for_status()
-    except Exception as e:
-        logger.warning(f"Server not reachable. Will retry in 30 seconds. Attempt {20 - times_to_fall + 1}/10")
-        if times_to_fall > 1:
-            time.sleep(30)
-            return reachable(times_to_fall - 1)
-        exit()
-
-def inform(user_id, balance, times_to_fall=20):
-    try:
-        if not balance:
-            balance = 0
-        response = requests.put(f"{ENDPOINT}/info/", json={
-            "user_id": user_id,
-            "balance": balance,
-        }, verify=False)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        logger.warning(f"Server not reachable. Will retry in 30 seconds. Attempt {20 - times_to_fall + 1}/10")
-        if times_to_fall > 1:
-            time.sleep(30)
-            return inform(user_id, balance, times_to_fall - 1)
-        exit()
-
-def get_cords_and_color(user_id, template, times_to_fall=20):
-    try:
-        response = requests.get(f"{ENDPOINT}/get_pixel/?user_id={user_id}&template={template}", verify=False)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        logger.warning(f"Server not reachable. Will retry in 30 seconds. Attempt {20 - times_to_fall + 1}/10")
-        if times_to_fall > 1:
-            time.sleep(30)
-            return get_cords_and_color(user_id, template, times_to_fall - 1)
-        exit()
-
-def template_to_join(cur_template=0, times_to_fall=20):
-    try:
-        response = requests.get(f"{ENDPOINT}/get_uncolored/?template={cur_template}", verify=False)
-        if response.status_code == 200:
-            resp = response.json()
-            return resp['template']
-        response.raise_for_status()
-    except Exception as e:
-        logger.warning(f"Server not reachable. Will retry in 30 seconds. Attempt {20 - times_to_fall + 1}/10")
-        if times_to_fall > 1:
-            time.sleep(30)
-            return template_to_join(cur_template, times_to_fall - 1)
-        exit()
+def get_pixel_provider():
+    return local_provider if settings.USE_LOCAL_PIXEL_PROVIDER else remote_provider
@@ -0,0 +1,72 @@
+import time
+
+from bot.utils import logger
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class FleetMetrics:
+    """
+    Startup timings of the running fleet, measured from :meth:`start`.
+
+    Records when each account finished preparing (proxy, user agent) and when it first painted a pixel,
+    and logs how long it took for the whole fleet to be running.
+    """
+
+    def __init__(self):
+        self.started_at: float | None = None
+        self.expected = 0
+        self.ready: dict[str, float] = {}
+        self.first_paint: dict[str, float] = {}
+        self.fleet_ready_after: float | None = None
+
+    def start(self, expected: int) -> None:
+        self.started_at = time.monotonic()
+        self.expected = expected
+        self.ready.clear()
+        self.first_paint.clear()
+        self.fleet_ready_after = None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at if self.started_at is not None else 0.0
+
+    def mark_ready(self, name: str) -> None:
+        if self.started_at is None or name in self.ready:
+            return
+        self.ready[name] = self.elapsed()
+        if len(self.ready) == self.expected:
+            self.fleet_ready_after = self.ready[name]
+            logger.info(f"Fleet | <cyan>{self.expected}</cyan> accounts started in "
+                        f"<cyan>{self.fleet_ready_after:.1f}</cyan>s")
+
+    def mark_paint(self, name: str) -> None:
+        if self.started_at is None or name in self.first_paint:
+            return
+        self.first_paint[name] = self.elapsed()
+        logger.info(f"{name} | First paint <cyan>{self.first_paint[name]:.1f}</cyan>s after start")
+
+    def stats(self) -> dict:
+        ttfp = list(self.first_paint.values())
+        return {
+            "accounts": self.expected,
+            "started": len(self.ready),
+            "fleet_ready_after": self.fleet_ready_after,
+            "painted": len(ttfp),
+            "ttfp_p50": percentile(ttfp, 0.5),
+            "ttfp_p90": percentile(ttfp, 0.9),
+            "ttfp_max": max(ttfp, default=0.0),
+        }
+
+    def log_stats(self) -> None:
+        stats = self.stats()
+        logger.info(f"Fleet | started: <cyan>{stats['started']}/{stats['accounts']}</cyan> | painted: "
+                    f"<cyan>{stats['painted']}</cyan> | time to first paint p50/p90/max: "
+                    f"<cyan>{stats['ttfp_p50']:.1f}/{stats['ttfp_p90']:.1f}/{stats['ttfp_max']:.1f}</cyan>s")
+
+
+fleet_metrics = FleetMetrics()
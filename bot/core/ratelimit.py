@@ -0,0 +1,213 @@
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from bot.config import settings
+from bot.utils import logger
+
+# Path fragments of the game API, per endpoint family.
+FAMILIES = {
+    "repaint": ("/repaint/",),
+    "status": ("/mining/status", "/mining/claim", "/mining/boost/", "/users/me"),
+    "template": ("/image/template/",),
+    "tasks": ("/mining/task/",),
+}
+
+
+def endpoint_family(url: str) -> str | None:
+    path = urlsplit(url).path
+    for family, fragments in FAMILIES.items():
+        if any(fragment in path for fragment in fragments):
+            return family
+    return None
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds from a ``Retry-After`` header, either delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class BucketStats:
+    requests: int = 0
+    throttled: int = 0
+    waited: float = 0.0
+
+
+class TokenBucket:
+    """
+    ``rate`` requests per second with bursts of up to ``burst``, shared by every account.
+
+    Waiters are served in arrival order. :meth:`pause` stops the bucket entirely until the server
+    is expected to accept requests again.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.backoff = 0.0
+        self.stats = BucketStats()
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                if self.rate <= 0:
+                    break
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+        self.stats.requests += 1
+        self.stats.waited += time.monotonic() - started
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        # Whatever was saved up before the push-back is not worth spending right after it.
+        self.tokens = 0.0
+        self.updated = self.paused_until
+
+
+@dataclass
+class ConcurrencyStats:
+    succeeded: int = 0
+    failed: int = 0
+    decreases: int = 0
+    slow: int = 0
+
+
+class ConcurrencyController:
+    """
+    AIMD limit on game API requests in flight across the fleet.
+
+    Each call that comes back in time adds ``1 / window`` to the window, so it grows by about one
+    slot per window-full of successes. A gateway error (502/503/504), a transport error, or a
+    response slower than ``latency_target`` halves it, at most once per ``cooldown`` so that a burst
+    of failures from the same overload counts once. The window stays within
+    ``[min_window, max_window]``.
+    """
+
+    OVERLOAD_STATUSES = (502, 503, 504)
+
+    def __init__(self, initial: float = 20, min_window: float = 2, max_window: float = 200,
+                 latency_target: float = 5, cooldown: float = 2):
+        self.window = float(initial)
+        self.min_window = min_window
+        self.max_window = max_window
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.counts = ConcurrencyStats()
+        self._decreased_at = 0.0
+        self._changed = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_flight < int(self.window))
+            self.in_flight += 1
+
+    async def release(self, latency: float, ok: bool) -> None:
+        if ok and latency <= self.latency_target:
+            self.counts.succeeded += 1
+            self.window = min(self.max_window, self.window + 1 / self.window)
+        else:
+            if ok:
+                self.counts.slow += 1
+            else:
+                self.counts.failed += 1
+            now = time.monotonic()
+            if now - self._decreased_at >= self.cooldown:
+                self._decreased_at = now
+                self.window = max(self.min_window, self.window / 2)
+                self.counts.decreases += 1
+        async with self._changed:
+            self.in_flight -= 1
+            self._changed.notify_all()
+
+    def stats(self) -> dict:
+        return {"window": int(self.window), "in_flight": self.in_flight, **asdict(self.counts)}
+
+    def log_stats(self) -> None:
+        stats = self.stats()
+        logger.info(f"Concurrency | window: <cyan>{stats['window']}</cyan> | in flight: <cyan>{stats['in_flight']}</cyan> | "
+                    f"ok: <green>{stats['succeeded']}</green> | slow: <yellow>{stats['slow']}</yellow> | "
+                    f"failed: <red>{stats['failed']}</red> | decreases: {stats['decreases']}")
+
+
+class RateLimiter:
+    """
+    Fleet-wide request budget for the game API, one :class:`TokenBucket` per endpoint family.
+
+    Every :class:`~bot.core.http_client.AsyncSession` takes a token before calling a known family, so
+    accounts share the budget instead of bursting on their own schedules. A 429 or 503 pauses the
+    whole family for its ``Retry-After``, or for an exponential backoff starting at ``min_backoff``
+    when the header is missing; the next successful response resets the backoff. Pushed-back
+    requests are sent again after the pause, up to ``retries`` times (non-idempotent ones only after a
+    429, which the server did not act on). When ``concurrency`` is given,
+    requests also wait for a slot in that :class:`ConcurrencyController`.
+    """
+
+    def __init__(self, limits: dict[str, list[float]], min_backoff: float = 2, max_backoff: float = 60,
+                 retries: int = 2, concurrency: ConcurrencyController | None = None):
+        self.concurrency = concurrency
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.retries = retries
+        self.buckets = {family: TokenBucket(*limits.get(family, (0, 1))) for family in FAMILIES}
+
+    def bucket(self, url: str) -> TokenBucket | None:
+        family = endpoint_family(url)
+        return self.buckets[family] if family is not None else None
+
+    def observe(self, bucket: TokenBucket, status: int, headers) -> float | None:
+        """Record a response; return the pause in seconds when the server pushed back."""
+        if status not in (429, 503):
+            bucket.backoff = 0.0
+            return None
+        bucket.stats.throttled += 1
+        delay = parse_retry_after(headers.get("Retry-After"))
+        if delay is None:
+            bucket.backoff = min(self.max_backoff, max(self.min_backoff, bucket.backoff * 2))
+            delay = bucket.backoff
+        bucket.pause(delay)
+        return delay
+
+    def log_stats(self) -> None:
+        if self.concurrency is not None:
+            self.concurrency.log_stats()
+        for family, bucket in self.buckets.items():
+            stats = bucket.stats
+            if not stats.requests:
+                continue
+            logger.info(f"Rate limit | {family} | requests: <cyan>{stats.requests}</cyan> | "
+                        f"throttled: <yellow>{stats.throttled}</yellow> | "
+                        f"avg wait: <cyan>{stats.waited / stats.requests:.2f}</cyan>s")
+
+
+rate_limiter = RateLimiter(settings.RATE_LIMITS, concurrency=ConcurrencyController(
+    initial=settings.API_CONCURRENCY[0], min_window=settings.API_CONCURRENCY[1], max_window=settings.API_CONCURRENCY[2],
+    latency_target=settings.API_LATENCY_TARGET) if settings.ADAPTIVE_CONCURRENCY else None)
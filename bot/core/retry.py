@@ -0,0 +1,114 @@
+import asyncio
+import random
+import time
+
+from bot.exceptions import HTTPError, RequestError, ServiceUnavailable
+from bot.utils import logger
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast once a service has failed ``threshold`` times in a row.
+
+    After ``reset_timeout`` seconds one trial call is let through while every other caller keeps
+    failing fast: success closes the breaker again, failure keeps it open for another
+    ``reset_timeout``. A trial that never reports back (e.g. cancelled) is replaced by a new one
+    after ``reset_timeout``.
+    """
+
+    def __init__(self, threshold: int = 10, reset_timeout: float = 60):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial_at: float | None = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state != "half-open":
+            return state == "closed"
+        now = time.monotonic()
+        if self.trial_at is not None and now - self.trial_at < self.reset_timeout:
+            return False
+        self.trial_at = now
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.trial_at = None
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class RetryPolicy:
+    """
+    Async retries with exponential backoff and full jitter, bounded by ``attempts`` and a total ``deadline``.
+
+    Waiting happens with ``asyncio.sleep`` so only the calling account is held up. Client errors
+    (4xx other than 429) are not retried. When the policy gives up, or the shared ``breaker`` is
+    open, :class:`ServiceUnavailable` is raised.
+    """
+
+    def __init__(self, name: str, attempts: int = 6, base_delay: float = 1, max_delay: float = 30,
+                 deadline: float = 120, retry_on: tuple = (RequestError,), breaker: CircuitBreaker | None = None):
+        self.name = name
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.retry_on = retry_on
+        self.breaker = breaker
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def retryable(self, error: BaseException) -> bool:
+        if isinstance(error, HTTPError) and error.response is not None:
+            status = error.response.status_code
+            if 400 <= status < 500 and status != 429:
+                return False
+        return isinstance(error, self.retry_on)
+
+    async def call(self, func, *args, **kwargs):
+        started = time.monotonic()
+        error = None
+        for attempt in range(1, self.attempts + 1):
+            if self.breaker is not None and not self.breaker.allow():
+                raise ServiceUnavailable(f"{self.name} is unavailable (circuit open)") from error
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as exc:
+                if not self.retryable(exc):
+                    if self.breaker is not None:
+                        # The service answered; only the request was wrong.
+                        self.breaker.record_success()
+                    raise
+                error = exc
+                if self.breaker is not None:
+                    self.breaker.record_failure()
+            else:
+                if self.breaker is not None:
+                    self.breaker.record_success()
+                return result
+
+            delay = self.backoff(attempt)
+            if attempt == self.attempts or time.monotonic() - started + delay > self.deadline:
+                break
+            logger.warning(f"{self.name} not reachable: {error}. Retry {attempt}/{self.attempts - 1} "
+                           f"in <cyan>{delay:.1f}</cyan>s")
+            await asyncio.sleep(delay)
+
+        raise ServiceUnavailable(f"{self.name} is unavailable after {attempt} attempts: {error}") from error
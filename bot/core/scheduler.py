@@ -0,0 +1,301 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+import traceback
+from random import randint, uniform
+
+from bot.config import settings
+from bot.exceptions import InvalidSession
+from bot.utils import logger
+from .auth import token_manager
+
+
+class _Slot:
+    """A :class:`Scheduler` worker held by one running round."""
+
+    def __init__(self, scheduler: "Scheduler"):
+        self.scheduler = scheduler
+        self.held = False
+
+    async def acquire(self) -> None:
+        await self.scheduler._slots.acquire()
+        self.held = True
+
+    def release(self) -> None:
+        if self.held:
+            self.held = False
+            self.scheduler._slots.release()
+
+
+_slot: contextvars.ContextVar[_Slot | None] = contextvars.ContextVar("scheduler_slot", default=None)
+
+
+async def pace(delay: float) -> None:
+    """
+    ``asyncio.sleep`` for the pauses inside a round; a round run by the :class:`Scheduler` gives its
+    worker to another account for the duration.
+    """
+    slot = _slot.get()
+    if slot is None or not slot.held:
+        await asyncio.sleep(delay)
+        return
+    slot.release()
+    slot.scheduler.pacing += 1
+    try:
+        await asyncio.sleep(delay)
+    finally:
+        slot.scheduler.pacing -= 1
+    await slot.acquire()
+
+
+def charge_aware_delay(status: dict | None, min_delay: float = 60, max_delay: float = 6 * 3600) -> float | None:
+    """
+    Seconds until an account next has something worth doing, from its ``/mining/status`` payload.
+
+    That is the earlier of charges being back at ``maxCharges`` (recharging past the cap is wasted) and
+    mining storage filling up (``fromStart`` reaching ``maxMiningTime``). Returns None when the payload
+    lacks the fields, so callers can fall back to a fixed delay.
+    """
+    try:
+        charges = int(status['charges'])
+        max_charges = int(status['maxCharges'])
+        period = float(status['reChargeSpeed']) / 1000
+        timer = float(status.get('reChargeTimer') or status['reChargeSpeed']) / 1000
+        max_mining_time = float(status['maxMiningTime'])
+        mining_left = max_mining_time - float(status['fromStart'])
+    except (TypeError, KeyError, ValueError):
+        return None
+
+    # Already full means nothing was painted; the next charge is the earliest useful wakeup.
+    full_in = period if charges >= max_charges else timer + (max_charges - charges - 1) * period
+    claim_in = mining_left if mining_left > 0 else max_mining_time
+    delay = min(full_in, claim_in)
+    delay -= uniform(0, min(30.0, delay * 0.1))
+    return min(max(delay, min_delay), max_delay)
+
+
+class AccountJob:
+    """
+    One account driven by the :class:`Scheduler`.
+
+    The Tapper instance is kept between rounds, but its HTTP session is opened for each round and closed
+    right after it, so an account waiting for its next round holds neither a coroutine nor sockets. When
+    the Telegram token would expire before the next round, the job is woken up early to renew it, so the
+    round itself doesn't wait on a pyrogram connect.
+    """
+
+    def __init__(self, tapper, proxy: str | None, ua: str):
+        self.tapper = tapper
+        self.proxy = proxy
+        self.ua = ua
+        self.rounds = 0
+        self.session = None
+        self.round_at = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.tapper.session_name
+
+    async def step(self) -> float | None:
+        """Run one round or token refresh; return the seconds until the next step, or None to drop the account."""
+        if time.monotonic() < self.round_at:
+            return await self._refresh_token()
+
+        delay = await self._round()
+        if delay is None:
+            return None
+        self.round_at = time.monotonic() + delay
+        refresh_in = token_manager.refresh_in(self.name, delay)
+        return delay if refresh_in is None else refresh_in
+
+    async def _refresh_token(self) -> float | None:
+        try:
+            await token_manager.refresh(self.name)
+        except InvalidSession:
+            logger.error(f"{self.name} | Invalid Session")
+            token_manager.invalidate(self.name)
+            return None
+        except Exception as error:
+            # The round fetches the token itself if this didn't work.
+            logger.warning(f"{self.name} | Token refresh failed: {error}")
+        finally:
+            token_manager.release(self.name)
+        return max(0.0, self.round_at - time.monotonic())
+
+    async def _round(self) -> float | None:
+        night_delay = self.tapper.night_delay()
+        if night_delay:
+            return night_delay
+
+        session = await self.tapper.open_session(self.proxy, self.ua, check_proxy=self.rounds == 0)
+        try:
+            completed = await self.tapper.run_round(session, self.proxy)
+        except InvalidSession:
+            logger.error(f"{self.name} | Invalid Session")
+            token_manager.invalidate(self.name)
+            return None
+        except Exception as error:
+            traceback.print_exc()
+            logger.error(f"{self.name} | Unknown error: {error}")
+            return randint(60, 120)
+        finally:
+            await session.close()
+            token_manager.release(self.name)
+
+        self.rounds += 1
+        if not completed:
+            return 15
+        delay = self.tapper.next_round_delay()
+        logger.info(f"{self.name} | Sleep {delay}s...")
+        return delay
+
+
+class Pipeline:
+    """
+    Sequential mode: accounts paint one at a time, in order, while the next account's token, login and
+    status are prepared in the background.
+
+    Tapper instances and their HTTP sessions are kept for the whole run instead of being rebuilt for every
+    account, so a pass costs about the painting time plus ``DELAY_EACH_ACCOUNT`` per account.
+    """
+
+    def __init__(self, jobs: list[AccountJob]):
+        self.jobs = jobs
+
+    async def _prepare(self, job: AccountJob) -> bool:
+        if job.session is None or job.session.closed:
+            job.session = await job.tapper.open_session(job.proxy, job.ua, check_proxy=job.rounds == 0)
+        return await job.tapper.prepare_round(job.session, job.proxy)
+
+    def _start(self, index: int) -> asyncio.Task | None:
+        if index >= len(self.jobs):
+            return None
+        return asyncio.create_task(self._prepare(self.jobs[index]))
+
+    async def _play(self, job: AccountJob, prepared: asyncio.Task) -> None:
+        night_delay = job.tapper.night_delay()
+        if night_delay:
+            # Prepared before the night; start over on the same session when it ends.
+            prepared.cancel()
+            await asyncio.gather(prepared, return_exceptions=True)
+            await asyncio.sleep(night_delay)
+            prepared = asyncio.create_task(self._prepare(job))
+        while not await prepared:
+            await asyncio.sleep(15)
+            prepared = asyncio.create_task(self._prepare(job))
+        await job.tapper.play_round(job.session)
+        job.rounds += 1
+
+    async def run_pass(self) -> None:
+        """Play every account once."""
+        pending = self._start(0)
+        try:
+            for index, job in enumerate(self.jobs):
+                prepared, pending = pending, self._start(index + 1)
+                try:
+                    await self._play(job, prepared)
+                except InvalidSession:
+                    logger.error(f"{job.name} | Invalid Session")
+                    token_manager.invalidate(job.name)
+                except Exception as error:
+                    traceback.print_exc()
+                    logger.error(f"{job.name} | Unknown error: {error}")
+                finally:
+                    token_manager.release(job.name)
+
+                sleep_ = randint(settings.DELAY_EACH_ACCOUNT[0], settings.DELAY_EACH_ACCOUNT[1])
+                logger.info(f"Sleep {sleep_}s...")
+                await asyncio.sleep(sleep_)
+        finally:
+            if pending is not None and not pending.done():
+                pending.cancel()
+
+    async def close(self) -> None:
+        for job in self.jobs:
+            if job.session is not None:
+                await job.session.close()
+
+
+class Scheduler:
+    """
+    Runs account rounds on ``workers`` concurrent workers in next-due order.
+
+    Waiting accounts are entries in a heap keyed by the time their next round is due, so thousands of
+    sessions cost a heap entry each while they sleep instead of a task each. A round holds a worker only
+    while it is doing something: during the pacing pauses between requests (see :func:`pace`) the worker
+    goes to the next due account, so ``workers`` bounds the rounds making requests at once. Rounds in
+    progress, each holding an HTTP session and a task, are bounded separately by ``max_rounds``.
+    """
+
+    def __init__(self, workers: int = 50, max_rounds: int = 1000):
+        self.workers = workers
+        self.max_rounds = max_rounds
+        self._rounds = asyncio.Semaphore(max_rounds)
+        self._heap: list[tuple[float, int, AccountJob]] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(workers)
+        self._tasks: set[asyncio.Task] = set()
+        self.running = 0
+        self.pacing = 0
+        self.rounds = 0
+        self.max_lateness = 0.0
+
+    def __len__(self) -> int:
+        return len(self._heap) + self.running
+
+    def add(self, job: AccountJob, delay: float = 0) -> None:
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), job))
+        self._wakeup.set()
+
+    async def _next(self) -> tuple[float, AccountJob]:
+        while True:
+            timeout = None
+            if self._heap:
+                timeout = self._heap[0][0] - time.monotonic()
+                if timeout <= 0:
+                    due, _, job = heapq.heappop(self._heap)
+                    return due, job
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _step(self, job: AccountJob, slot: _Slot) -> None:
+        _slot.set(slot)
+        try:
+            delay = await job.step()
+        except Exception as error:
+            logger.error(f"{job.name} | Unknown error: {error}")
+            delay = randint(60, 120)
+        finally:
+            self.running -= 1
+            slot.release()
+            self._rounds.release()
+        self.rounds += 1
+        if delay is not None:
+            self.add(job, delay)
+
+    async def run(self) -> None:
+        try:
+            while True:
+                await self._rounds.acquire()
+                due, job = await self._next()
+                slot = _Slot(self)
+                await slot.acquire()
+                self.max_lateness = max(self.max_lateness, time.monotonic() - due)
+                self.running += 1
+                task = asyncio.create_task(self._step(job, slot))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+    def log_stats(self) -> None:
+        logger.info(f"Scheduler | accounts: <cyan>{len(self)}</cyan> | running: <cyan>{self.running}</cyan> | "
+                    f"pacing: <cyan>{self.pacing}</cyan> | workers: {self.workers} | max rounds: {self.max_rounds} | rounds: <cyan>{self.rounds}</cyan> | "
+                    f"max lateness: <cyan>{self.max_lateness:.1f}</cyan>s")
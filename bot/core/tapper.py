@@ -1,29 +1,32 @@
 import asyncio
 import json
 import random
+from collections import deque
 from itertools import cycle
 from urllib.parse import unquote
 
 import aiohttp
-import requests
-from aiocfscrape import CloudflareScraper
-from aiofile import AIOFile
-from aiohttp_proxy import ProxyConnector
 from better_proxy import Proxy
 from pyrogram import Client
 from pyrogram.errors import Unauthorized, UserDeactivated, AuthKeyUnregistered, FloodWait
 from pyrogram.raw.types import InputBotAppShortName
 from pyrogram.raw.functions.messages import RequestAppWebView
-from bot.core.agents import generate_random_user_agent, fetch_version
+from bot.core.agents import fetch_version
 from bot.config import settings
 from datetime import datetime, timedelta
 from tzlocal import get_localzone
-import time as time_module
 
-from bot.core.image_checker import get_cords_and_color, template_to_join, inform, reachable
+from bot.core.image_checker import get_pixel_provider, local_provider
 from bot.utils import logger
-from bot.exceptions import InvalidSession
+from bot.exceptions import InvalidSession, RequestError, ServiceUnavailable
 from .headers import headers
+from .http_client import AsyncSession, ConnectionPool
+from .templates import template_store
+from .canvas import PALETTE, TemplateGrid, canvas
+from .allocator import allocator
+from .metrics import fleet_metrics
+from .auth import token_manager
+from .scheduler import AccountJob, Pipeline, charge_aware_delay, pace
 from random import randint
 import urllib3
 import base64
@@ -34,8 +37,7 @@ import io
 import traceback
 from bot.utils.ps import check_base_url
 import sys
-import cloudscraper
-from bot.utils import launcher as lc
+from bot.utils.accounts import account_store
 
 
 def generate_websocket_key():
@@ -46,11 +48,11 @@ def generate_websocket_key():
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-API_GAME_ENDPOINT = "https://notpx.app/api/v1"
+API_GAME_ENDPOINT = settings.API_GAME_ENDPOINT
 
 
 class Tapper:
-    def __init__(self, tg_client: Client, multi_thread: bool):
+    def __init__(self, tg_client: Client, multi_thread: bool, pool: ConnectionPool | None = None):
         self.tg_client = tg_client
         self.session_name = tg_client.name
         self.first_name = ''
@@ -62,11 +64,9 @@ class Tapper:
         self.maxtime = 0
         self.fromstart = 0
         self.balance = 0
-        self.color_list = ["#FFD635", "#7EED56", "#00CCC0", "#51E9F4", "#94B3FF", "#000000", "#898D90", "#E46E6E",
-                           "#E4ABFF", "#FF99AA", "#FFB470", "#FFFFFF", "#BE0039", "#FF9600", "#00CC78", "#009EAA",
-                           "#3690EA", "#6A5CFF", "#B44AC0", "#FF3881", "#9C6926", "#6D001A", "#BF4300", "#00A368",
-                           "#00756F", "#2450A4", "#493AC1", "#811E9F", "#A00357", "#6D482F"]
+        self.color_list = PALETTE
         self.multi_thread = multi_thread
+        self.pool = pool
         self.my_ref = "f6624523270"
         self.clb_ref = "f7385650582"
         self.socket = None
@@ -91,9 +91,12 @@ class Tapper:
             "reChargeSpeed": False
         }
         self.user_upgrades = None
+        self.mining_status = None
+        self.round_status = None
         self.template_to_join = 0
         self.completed_task = None
         self.query_anti = None
+        self.headers = headers.copy()
 
     async def get_tg_web_data(self, proxy: str | None) -> str:
         try:
@@ -127,10 +130,10 @@ class Tapper:
                 except (Unauthorized, UserDeactivated, AuthKeyUnregistered):
                     raise InvalidSession(self.session_name)
 
-            while True:
+            peer = token_manager.peers.get(self.session_name)
+            while peer is None:
                 try:
-                    peer = await self.tg_client.resolve_peer('notpixel')
-                    break
+                    peer = token_manager.peers[self.session_name] = await self.tg_client.resolve_peer('notpixel')
                 except FloodWait as fl:
 
                     logger.warning(f"<light-yellow>{self.session_name}</light-yellow> | FloodWait {fl}")
@@ -165,21 +168,22 @@ class Tapper:
             raise error
 
         except Exception as error:
+            token_manager.peers.pop(self.session_name, None)
             logger.error(f"<light-yellow>{self.session_name}</light-yellow> | Unknown error during Authorization: "
                          f"{error}")
             await asyncio.sleep(delay=3)
 
-    async def check_proxy(self, http_client: aiohttp.ClientSession, proxy: Proxy):
+    async def check_proxy(self, session: AsyncSession, proxy: Proxy):
         try:
-            response = await http_client.get(url='https://httpbin.org/ip', timeout=aiohttp.ClientTimeout(5), )
-            ip = (await response.json()).get('origin')
+            response = await session.get(url='https://httpbin.org/ip', timeout=aiohttp.ClientTimeout(5), )
+            ip = response.json().get('origin')
             logger.info(f"{self.session_name} | Proxy IP: {ip}")
             return True
         except Exception as error:
             logger.error(f"{self.session_name} | Proxy: {proxy} | Error: {error}")
             return False
 
-    async def anti_detect(self, http_client: aiohttp.ClientSession, u):
+    async def anti_detect(self, session: AsyncSession, u):
         try:
             payload = {
                 "d": "notpx.app",
@@ -187,17 +191,17 @@ class Tapper:
                 "r": "https://web.telegram.org/",
                 "u": f"https://app.notpx.app/#tgWebAppData={u}&tgWebAppVersion=7.10&tgWebAppPlatform=android&tgWebAppThemeParams=%7B%22bg_color%22%3A%22%23212121%22%2C%22text_color%22%3A%22%23ffffff%22%2C%22hint_color%22%3A%22%23aaaaaa%22%2C%22link_color%22%3A%22%238774e1%22%2C%22button_color%22%3A%22%238774e1%22%2C%22button_text_color%22%3A%22%23ffffff%22%2C%22secondary_bg_color%22%3A%22%230f0f0f%22%2C%22header_bg_color%22%3A%22%23212121%22%2C%22accent_text_color%22%3A%22%238774e1%22%2C%22section_bg_color%22%3A%22%23212121%22%2C%22section_header_text_color%22%3A%22%23aaaaaa%22%2C%22subtitle_text_color%22%3A%22%23aaaaaa%22%2C%22destructive_text_color%22%3A%22%23e53935%22%7D"
             }
-            response = await http_client.post("https://plausible.joincommunity.xyz/api/event", json=payload)
+            response = await session.post(f"{settings.ANALYTICS_ENDPOINT}/api/event", json=payload)
             # print(response.status)
-            if response.status == 202:
+            if response.status_code == 202:
                 return True
             else:
                 return False
         except:
             return False
 
-    def login(self, session):
-        response = session.get(f"{API_GAME_ENDPOINT}/users/me", headers=headers)
+    async def login(self, session):
+        response = await session.get(f"{API_GAME_ENDPOINT}/users/me", headers=self.headers)
         if response.status_code == 200:
             logger.success(f"{self.session_name} | <green>Logged in.</green>")
             return True
@@ -206,10 +210,11 @@ class Tapper:
             logger.warning("{self.session_name} | <red>Failed to login</red>")
             return False
 
-    def get_user_data(self, session):
-        response = session.get(f"{API_GAME_ENDPOINT}/mining/status", headers=headers)
+    async def get_user_data(self, session):
+        response = await session.get(f"{API_GAME_ENDPOINT}/mining/status", headers=self.headers)
         if response.status_code == 200:
-            return response.json()
+            self.mining_status = response.json()
+            return self.mining_status
         else:
             print(response.json())
             return None
@@ -223,7 +228,7 @@ class Tapper:
     def generate_random_pos(self):
         return randint(1, 1000000)
 
-    def repaintV2(self, session, chance_left, i, data):
+    async def repaintV2(self, session, chance_left, i, data):
         if i % 2 == 0:
             payload = {
                 "newColor": data[0],
@@ -236,8 +241,9 @@ class Tapper:
                 "newColor": data1[0],
                 "pixelId": data[1]
             }
-        response = session.post(f"{API_GAME_ENDPOINT}/repaint/start", headers=headers, json=payload)
+        response = await session.post(f"{API_GAME_ENDPOINT}/repaint/start", headers=self.headers, json=payload)
         if response.status_code == 200:
+            fleet_metrics.mark_paint(self.session_name)
             if i % 2 == 0:
                 logger.success(
                     f"{self.session_name} | <green>Painted <cyan>{data[1]}</cyan> with color: <cyan>{data[0]}</cyan> | Earned <light-blue>{int(response.json()['balance']) - self.balance}</light-blue> | Balance: <light-blue>{response.json()['balance']}</light-blue> | Repaint left: <yellow>{chance_left}</yellow></green>")
@@ -255,32 +261,32 @@ class Tapper:
         if self.user_upgrades['paintReward'] >= self.max_lvl['paintReward']:
             self.is_max_lvl['paintReward'] = True
             return
-        res = session.get(f"{API_GAME_ENDPOINT}/mining/boost/check/paintReward", headers=headers)
+        res = await session.get(f"{API_GAME_ENDPOINT}/mining/boost/check/paintReward", headers=self.headers)
         if res.status_code == 200:
             logger.success(f"{self.session_name} | <green>Upgrade paint reward successfully!</green>")
-        await asyncio.sleep(random.uniform(2, 4))
+        await pace(random.uniform(2, 4))
 
     async def auto_upgrade_recharge_speed(self, session):
         if self.user_upgrades['reChargeSpeed'] >= self.max_lvl['reChargeSpeed']:
             self.is_max_lvl['reChargeSpeed'] = True
             return
-        res = session.get(f"{API_GAME_ENDPOINT}/mining/boost/check/reChargeSpeed", headers=headers)
+        res = await session.get(f"{API_GAME_ENDPOINT}/mining/boost/check/reChargeSpeed", headers=self.headers)
         if res.status_code == 200:
             logger.success(f"{self.session_name} | <green>Upgrade recharging speed successfully!</green>")
-        await asyncio.sleep(random.uniform(2, 4))
+        await pace(random.uniform(2, 4))
 
     async def auto_upgrade_energy_limit(self, session):
         if self.user_upgrades['energyLimit'] >= self.max_lvl['energyLimit']:
             self.is_max_lvl['energyLimit'] = True
             return
-        res = session.get(f"{API_GAME_ENDPOINT}/mining/boost/check/energyLimit", headers=headers)
+        res = await session.get(f"{API_GAME_ENDPOINT}/mining/boost/check/energyLimit", headers=self.headers)
         if res.status_code == 200:
             logger.success(f"{self.session_name} | <green>Upgrade energy limit successfully!</green>")
 
     # MODIFIED FUNCTION: claimpx
-    def claimpx(self, session):
+    async def claimpx(self, session):
         try:
-            res = session.get(f"{API_GAME_ENDPOINT}/mining/claim", headers=headers)
+            res = await session.get(f"{API_GAME_ENDPOINT}/mining/claim", headers=self.headers)
             if res.status_code == 200:
                 logger.success(
                     f"{self.session_name} | Successfully claimed <cyan>{res.json()['claimed']}</cyan> px from mining!"
@@ -290,18 +296,18 @@ class Tapper:
                 # Handle JSON parsing errors and log response text
                 try:
                     error_message = res.json()
-                except requests.exceptions.JSONDecodeError:
+                except json.JSONDecodeError:
                     error_message = res.text or "No content"
                     escaped_message = html.escape(error_message)
                 logger.warning(f"{self.session_name} | Failed to claim px from mining: {escaped_message}")
-        except requests.exceptions.RequestException as e:
+        except RequestError as e:
             logger.error(f"{self.session_name} | HTTP request failed: {e}")
 
     async def subscribe_template(self, session, template_id: int):
         for attempt in range(3):
             try:
 
-                resp = session.put(f'{API_GAME_ENDPOINT}/image/template/subscribe/{template_id}', headers=headers)
+                resp = await session.put(f'{API_GAME_ENDPOINT}/image/template/subscribe/{template_id}', headers=self.headers)
 
                 if resp.status_code == 200 or resp.status_code == 204:
                     logger.success(
@@ -313,7 +319,7 @@ class Tapper:
             except Exception as e:
                 if resp.status_code == 504:
                     logger.warning(f"{self.session_name} | Attempt {attempt}: Connection timeout, retry after 3-5s...")
-                    await asyncio.sleep(random.randint(3, 5))
+                    await pace(random.randint(3, 5))
                 else:
                     logger.error(
                         f"{self.session_name} | <red>Unknown error while subscribing to template {template_id}: <light-yellow>{e}</light-yellow> </red>")
@@ -321,7 +327,7 @@ class Tapper:
     async def get_template(self, session):
         for attempts in range(3):
             try:
-                res = session.get(f'{API_GAME_ENDPOINT}/image/template/my', headers=headers)
+                res = await session.get(f'{API_GAME_ENDPOINT}/image/template/my', headers=self.headers)
 
                 if res.status_code == 200:
                     return res.json()
@@ -330,7 +336,7 @@ class Tapper:
             except Exception as e:
                 if res.status_code == 504:
                     logger.warning(f"{self.session_name} | Attempt {attempts}: Connection timeout, retry after 3-5s...")
-                    await asyncio.sleep(random.randint(3, 5))
+                    await pace(random.randint(3, 5))
                 else:
                     logger.error(
                         f"{self.session_name} | <red>Unknown error while getting template info: <light-yellow>{e}</light-yellow></red>")
@@ -340,15 +346,15 @@ class Tapper:
     async def get_template_info(self, session):
         for attempts in range(3):
             try:
-                res = session.get(f'https://notpx.app/api/v1/image/template/my',
-                                  headers=headers)
+                res = await session.get(f'{API_GAME_ENDPOINT}/image/template/my',
+                                        headers=self.headers)
                 data = res.json()
 
                 return data
             except Exception as e:
                 if res.status_code == 504:
                     logger.warning(f"{self.session_name} | Attempt {attempts}: Connection timeout, retry after 3-5s...")
-                    await asyncio.sleep(random.randint(3, 5))
+                    await pace(random.randint(3, 5))
                     continue
                 else:
                     logger.error(
@@ -357,17 +363,17 @@ class Tapper:
 
     async def notpx_template(self, session):
         try:
-            stats_req = session.get(f'{API_GAME_ENDPOINT}/image/template/my', headers=headers)
+            stats_req = await session.get(f'{API_GAME_ENDPOINT}/image/template/my', headers=self.headers)
             stats_req.raise_for_status()
             cur_template = stats_req.json()
             return cur_template.get("id")
         except Exception as error:
             return 0
 
-    async def need_join_template(self, session):
+    async def need_join_template(self, session, provider):
         try:
             tmpl = await self.notpx_template(session)
-            self.template_to_join = template_to_join(tmpl)
+            self.template_to_join = str(await provider.template_to_join(tmpl))
             return str(tmpl) != self.template_to_join
         except Exception as error:
             logger.error(f"Failed to determine template join requirement: {error}")
@@ -375,40 +381,70 @@ class Tapper:
 
     async def join_template(self, session, template_id):
         try:
-            resp = session.put(f"{API_GAME_ENDPOINT}/image/template/subscribe/{template_id}", headers=headers)
+            resp = await session.put(f"{API_GAME_ENDPOINT}/image/template/subscribe/{template_id}", headers=self.headers)
             resp.raise_for_status()
             return resp.status_code == 204
         except Exception as error:
             logger.error(f"Error joining template: {error}")
             return False
 
+    async def load_local_template(self, session):
+        template_info = await self.get_template_info(session)
+        if not template_info or not template_info.get('url'):
+            return False
+        image = await self.get_image(session, template_info['url'], image_headers={'Host': 'static.notpx.app'})
+        if image is None:
+            return False
+        grid = template_store.grid(template_info['url'], template_info['x'], template_info['y'],
+                                   template_info['imageSize'])
+        local_provider.add_template(template_info['id'], grid)
+        self.template_to_join = str(template_info['id'])
+        if await canvas.refresh(session, max_age=settings.CANVAS_SNAPSHOT_INTERVAL):
+            logger.info(f"{self.session_name} | Pixels left on template: <cyan>{canvas.mismatches(grid)}</cyan>")
+        return True
+
     async def make_paint_request(self, session, yx, color, delay_start, delay_end):
         try:
-            paint_request = session.post(f'{API_GAME_ENDPOINT}/repaint/start',
-                                         json={"pixelId": int(yx), "newColor": color}, headers=headers)
+            paint_request = await session.post(f'{API_GAME_ENDPOINT}/repaint/start',
+                                               json={"pixelId": int(yx), "newColor": color}, headers=self.headers)
             paint_request.raise_for_status()
             paint_request_json = paint_request.json()
             cur_balance = paint_request_json.get("balance", self.balance)
             change = max(0, cur_balance - self.balance)
             self.balance = cur_balance
+            canvas.set_pixel(int(yx), color)
+            fleet_metrics.mark_paint(self.session_name)
+            allocator.mark_painted(self.session_name, int(yx))
             logger.success(
                 f"{self.session_name} | Painted <cyan>{yx}</cyan> with color: <cyan>{color}</cyan> | Earned +<red>{change}</red> px | Balance: <cyan>{self.balance}</cyan> px")
 
-            await asyncio.sleep(delay=randint(delay_start, delay_end))
+            await pace(delay=randint(delay_start, delay_end))
             return True
 
         except json.JSONDecodeError:
             logger.info(f"{self.session_name} | Server does not response!")
             return False
 
-        except requests.RequestException as e:
+        except RequestError as e:
             logger.error(f"Failed to paint due to network error: {e}")
-            await asyncio.sleep(5)
+            await pace(5)
             return False
 
-    async def paint(self, session, retries=10):
+    async def pixel_plan(self, session, provider, count):
+        """Pixels for this round from ``provider``, picked locally when the pixel server is down."""
+        if provider is not local_provider:
+            try:
+                return await provider.get_plan(user_id=self.user_id, template=self.template_to_join, count=count)
+            except ServiceUnavailable as error:
+                logger.warning(f"{self.session_name} | <yellow>Pixel server unavailable, picking pixels locally: {error}</yellow>")
+        if not await self.load_local_template(session):
+            raise LookupError("failed to load template for local painting")
+        # Local leases are per session like repaintV5's; query accounts have no user id.
+        return await local_provider.get_plan(user_id=self.session_name, template=self.template_to_join, count=count)
+
+    async def paint(self, session, provider, retries=10):
         try:
-            stats_json = self.get_user_data(session)
+            stats_json = await self.get_user_data(session)
             if stats_json is None:
                 logger.warning(f"{self.session_name} | Failed to get user data!")
                 return
@@ -417,7 +453,7 @@ class Tapper:
             max_charges = stats_json.get('maxCharges', 24)
             logger.info(f"{self.session_name} | Charges: <yellow>{charges}/{max_charges}</yellow>")
 
-            if await self.need_join_template(session):
+            if await self.need_join_template(session, provider):
                 result = await self.join_template(session, self.template_to_join)
                 if result:
                     logger.success(
@@ -427,40 +463,46 @@ class Tapper:
                         f"{self.session_name} | <yellow>Failed to join template: {self.template_to_join}</yellow>")
                     return
 
-            for _ in range(charges):
-                try:
-                    q = get_cords_and_color(user_id=self.user_id, template=self.template_to_join)
-                    coords = q["coords"]
-                    color = q["color"]
-                    yx = coords
-                    a = await self.make_paint_request(session, yx, color, 5, 10)
-                    if a is False:
-                        return
-                except Exception as error:
-                    logger.warning(
-                        f"{self.session_name} | <yellow>No pixels to paint or error occurred: {error}</yellow>")
+            try:
+                plan = await self.pixel_plan(session, provider, charges)
+            except Exception as error:
+                logger.warning(
+                    f"{self.session_name} | <yellow>No pixels to paint or error occurred: {error}</yellow>")
+                return
+            if not plan:
+                logger.warning(f"{self.session_name} | <yellow>No pixels to paint</yellow>")
+                return
+
+            for yx, color in plan:
+                a = await self.make_paint_request(session, yx, color, 5, 10)
+                if a is False:
                     return
 
         except json.JSONDecodeError:
             logger.info(f"{self.session_name} | Error during painting: Server does not response!")
 
-        except requests.RequestException as error:
+        except RequestError as error:
             logger.error(f"Error during painting: {error}")
             if retries > 0:
-                await asyncio.sleep(10)
+                await pace(10)
                 logger.info(f"{self.session_name} | Retry after 10 seconds...")
-                await self.paint(session, retries=retries - 1)
+                await self.paint(session, provider, retries=retries - 1)
+
+        finally:
+            local_provider.release(self.session_name)
 
-    def paintv2(self, session, x, y, color, chance_left):
-        pxId = y * 1000 + x + 1
+    async def paintv2(self, session, pxId, color, chance_left):
         payload = {
             "pixelId": pxId,
             "newColor": color
         }
 
-        res = session.post(f"{API_GAME_ENDPOINT}/repaint/start", headers=headers,
-                           json=payload)
+        res = await session.post(f"{API_GAME_ENDPOINT}/repaint/start", headers=self.headers,
+                                 json=payload)
         if res.status_code == 200:
+            canvas.set_pixel(pxId, color)
+            allocator.mark_painted(self.session_name, pxId)
+            fleet_metrics.mark_paint(self.session_name)
             logger.success(
                 f"{self.session_name} | <green>Painted <cyan>{pxId}</cyan> with color: <cyan>{color}</cyan> | Earned <light-blue>{round(int(res.json()['balance']) - self.balance)}</light-blue> | Balance: <light-blue>{res.json()['balance']}</light-blue> | Repaint left: <yellow>{chance_left}</yellow></green>")
             self.balance = int(res.json()['balance'])
@@ -482,7 +524,13 @@ class Tapper:
             if not curr_image:
                 return None
 
-            user_data = self.get_user_data(session)
+            curr_grid = None
+            if template_info.get('url'):
+                curr_grid = template_store.grid(template_info['url'], curr_start_x, curr_start_y, curr_image_size)
+            if curr_grid is None:
+                curr_grid = TemplateGrid.from_image(curr_image, curr_start_x, curr_start_y, curr_image_size)
+
+            user_data = await self.get_user_data(session)
 
             if user_data is None:
                 return None
@@ -497,24 +545,34 @@ class Tapper:
                 logger.info(f"{self.session_name} | No energy left...")
                 return None
 
+            # Mismatched pixels are leased first when the canvas is known; the allocator keeps
+            # accounts in this process from painting the same pixel.
+            snapshot = None
+            if await canvas.refresh(session, max_age=settings.CANVAS_SNAPSHOT_INTERVAL):
+                snapshot = canvas
+                logger.info(f"{self.session_name} | Pixels left on template: <cyan>{canvas.mismatches(curr_grid)}</cyan>")
+            paint_queue = deque()
+
             tries = 2
 
             while Total_attempt > 0:
                 try:
-                    x = randint(0, curr_image_size - 5)
-                    y = randint(0, curr_image_size - 5)
                     if Total_attempt == 0:
                         return
-                    image_pixel = curr_image.getpixel((x, y))
-                    image_hex_color = '#{:02x}{:02x}{:02x}'.format(*image_pixel)
+                    if not paint_queue:
+                        paint_queue = allocator.lease(self.session_name, curr_grid,
+                                                      min(Total_attempt, allocator.batch_size), snapshot)
+                        if not paint_queue:
+                            logger.info(f"{self.session_name} | Template has no paintable pixels")
+                            return
+                    pxId, color = paint_queue.popleft()
                     Total_attempt -= 1
-                    if self.paintv2(session, curr_start_x + x, curr_start_y + y, image_hex_color.upper(),
-                                    Total_attempt) is False:
+                    if await self.paintv2(session, pxId, color, Total_attempt) is False:
                         return
-                    await asyncio.sleep(delay=random.randint(4, 10))
+                    await pace(delay=random.randint(4, 10))
                 except Exception as e:
                     if 'Gateway Timeout' in str(e):
-                        status_data = self.get_user_data(session)
+                        status_data = await self.get_user_data(session)
 
                         if status_data:
                             charges = status_data['charges']
@@ -526,7 +584,7 @@ class Tapper:
                             tries = tries - 1
                             sleep_time = random.randint(10, 20)
                             logger.info(f"{self.session_name} | Restart drawing in {round(sleep_time)} seconds...")
-                            await asyncio.sleep(delay=sleep_time)
+                            await pace(delay=sleep_time)
                             continue
                         else:
                             logger.warning(
@@ -547,9 +605,14 @@ class Tapper:
             else:
                 logger.error(
                     f"{self.session_name} | <red>Unknown error while painting: <light-yellow>{e}</light-yellow></red>")
-            await asyncio.sleep(random.randint(2, 5))
+            await pace(random.randint(2, 5))
+        finally:
+            allocator.release(self.session_name)
 
     async def get_image(self, session, url, image_headers):
+        return await template_store.get(url, lambda: self.load_image(session, url, image_headers))
+
+    async def load_image(self, session, url, image_headers):
         image_filename = os.path.join(self.cache, url.split("/")[-1])
 
         try:
@@ -565,17 +628,16 @@ class Tapper:
         try:
             logger.info(f"{self.session_name} | Downloading image from server...")
             if "https://fra1.digitaloceanspaces.com/" in url:
-                response = requests.get(url, stream=True)
+                response = await session.get(url)
                 if response.status_code == 200:
                     with open(image_filename, "wb") as file:
-                        for chunk in response.iter_content(1024):
-                            file.write(chunk)
+                        file.write(response.content)
 
                 img = Image.open(image_filename)
                 img.load()
                 return img
             else:
-                res = session.get(url, headers=image_headers)
+                res = await session.get(url, headers=image_headers)
 
                 if res.status_code == 200:
                     img_data = res.content
@@ -592,7 +654,7 @@ class Tapper:
             return None
 
     async def use_pumpkin(self, session):
-        user_data = self.get_user_data(session)
+        user_data = await self.get_user_data(session)
         self.balance = int(user_data['userBalance'])
         if user_data is None:
             return
@@ -609,8 +671,8 @@ class Tapper:
         for _ in range(total_bombs):
             try:
                 pos = self.generate_random_pos()
-                res = session.post('https://notpx.app/api/v1/repaint/special',
-                                                       json={"pixelId": int(pos), "type": 7}, headers=headers)
+                res = await session.post(f'{API_GAME_ENDPOINT}/repaint/special',
+                                                             json={"pixelId": int(pos), "type": 7}, headers=self.headers)
                 res.raise_for_status()
                 cur_balance = self.balance + 196
                 change = cur_balance - self.balance
@@ -619,7 +681,7 @@ class Tapper:
                 self.balance = cur_balance
                 logger.success(
                     f"{self.session_name} | <green> Painted <cyan>{pos}</cyan> with <cyan>Pumkin bomb</cyan>! | got <red>{change:.1f}</red> px | Balance: <cyan>{self.balance}</cyan> px </green>")
-                await asyncio.sleep(randint(2,5))
+                await pace(randint(2,5))
             except:
                 traceback.print_exc()
                 logger.warning(f"{self.session_name} | <yellow>Nothing left to paint!</yellow>")
@@ -627,268 +689,248 @@ class Tapper:
 
 
 
-    async def run(self, proxy: str | None, ua: str) -> None:
-        access_token_created_time = 0
-        proxy_conn = ProxyConnector().from_url(proxy) if proxy else None
-
-        headers["User-Agent"] = ua
-        chrome_ver = fetch_version(headers['User-Agent'])
-        headers['Sec-Ch-Ua'] = f'"Chromium";v="{chrome_ver}", "Android WebView";v="{chrome_ver}", "Not.A/Brand";v="99"'
-        http_client = CloudflareScraper(headers=headers, connector=proxy_conn)
+    async def open_session(self, proxy: str | None, ua: str, check_proxy: bool = True) -> AsyncSession:
+        self.headers["User-Agent"] = ua
+        chrome_ver = fetch_version(self.headers['User-Agent'])
+        self.headers['Sec-Ch-Ua'] = f'"Chromium";v="{chrome_ver}", "Android WebView";v="{chrome_ver}", "Not.A/Brand";v="99"'
+        session = AsyncSession(headers=self.headers, proxy=proxy, pool=self.pool)
 
-        session = cloudscraper.create_scraper()
-
-        if proxy:
-            proxy_check = await self.check_proxy(http_client=http_client, proxy=proxy)
+        if proxy and check_proxy:
+            proxy_check = await self.check_proxy(session=session, proxy=proxy)
             if proxy_check:
-                proxy_type = proxy.split(':')[0]
-                proxies = {
-                    proxy_type: proxy
-                }
-                session.proxies.update(proxies)
                 logger.info(f"{self.session_name} | bind with proxy ip: {proxy}")
+        return session
+
+    def night_delay(self) -> float:
+        """Seconds left of the NIGHT_MODE sleep window, 0 outside of it."""
+        local_timezone = get_localzone()
+        current_time = datetime.now(local_timezone)
+        start_time = current_time.replace(hour=settings.SLEEP_TIME[0], minute=0, second=0, microsecond=0)
+        end_time = current_time.replace(hour=settings.SLEEP_TIME[1], minute=0, second=0, microsecond=0)
+
+        if end_time < start_time:
+            end_time += timedelta(days=1)
+
+        if settings.NIGHT_MODE and (start_time <= current_time <= end_time):
+            time_to_sleep = (end_time - current_time).total_seconds()
+            logger.info(f"{self.session_name} | Sleeping for {time_to_sleep} seconds until {end_time}.")
+            return time_to_sleep
+        return 0
+
+    def next_round_delay(self) -> float:
+        if settings.WAKEUP_MODE == "charges":
+            delay = charge_aware_delay(self.mining_status)
+            if delay is not None:
+                return round(delay)
+        return randint(settings.SLEEP_TIME_BETWEEN_EACH_ROUND[0], settings.SLEEP_TIME_BETWEEN_EACH_ROUND[1])
+
+    async def prepare_round(self, session: AsyncSession, proxy: str | None) -> bool:
+        """Version check, token, login and ``/mining/status`` for the next round. False means retry shortly."""
+        self.round_status = None
+        if await check_base_url() is False:
+            if settings.ADVANCED_ANTI_DETECTION:
+                self.can_run = False
+                logger.warning(
+                    "<yellow>Detected index js file change. </yellow>")
+            else:
+                self.can_run = False
+                logger.warning(
+                    "<yellow>Detected api change! Stoped the bot for safety. </yellow>")
+        else:
+            self.can_run = True
 
-        token_live_time = randint(1000, 1500)
-        while True:
-            try:
-                if check_base_url() is False:
-                    if settings.ADVANCED_ANTI_DETECTION:
-                        self.can_run = False
-                        logger.warning(
-                            "<yellow>Detected index js file change. </yellow>")
-                    else:
-                        self.can_run = False
-                        logger.warning(
-                            "<yellow>Detected api change! Stoped the bot for safety. </yellow>")
-                else:
-                    self.can_run = True
-
-                if self.can_run:
-                    if time_module.time() - access_token_created_time >= token_live_time:
-                        tg_web_data = await self.get_tg_web_data(proxy=proxy)
-                        headers['Authorization'] = f"initData {tg_web_data}"
-                        self.balance = 0
-                        access_token_created_time = time_module.time()
-                        token_live_time = randint(1000, 1500)
-
-
-                    local_timezone = get_localzone()
-                    current_time = datetime.now(local_timezone)
-                    start_time = current_time.replace(hour=settings.SLEEP_TIME[0], minute=0, second=0, microsecond=0)
-                    end_time = current_time.replace(hour=settings.SLEEP_TIME[1], minute=0, second=0, microsecond=0)
-
-                    if end_time < start_time:
-                        end_time += timedelta(days=1)
-
-                    if settings.NIGHT_MODE and (start_time <= current_time <= end_time):
-                        time_to_sleep = (end_time - current_time).total_seconds()
-                        logger.info(f"{self.session_name} | Sleeping for {time_to_sleep} seconds until {end_time}.")
-                        await asyncio.sleep(time_to_sleep)
-
-                    if await self.anti_detect(http_client, self.query_anti) is False:
-                        await asyncio.sleep(15)
-                        continue
-
-                    elif self.login(session):
-                        user = self.get_user_data(session)
-
-                        if user:
-                            self.maxtime = user['maxMiningTime']
-                            self.fromstart = user['fromStart']
-                            self.balance = int(user['userBalance'])
-                            self.user_upgrades = user['boosts']
-                            repaints = int(user['repaintsTotal'])
-                            user_league = user['league']
-                            logger.info(
-                                f"{self.session_name} | Pixel Balance: <light-blue>{int(user['userBalance'])}</light-blue> | Pixel available to paint: <cyan>{user['charges']}</cyan> | User league: <yellow>{user_league}</yellow>")
-
-                            if settings.USE_PUMPKIN_BOMBS:
-                                await self.use_pumpkin(session)
-
-                            if user['charges'] > 0:
-                                if settings.USE_RANDOM_TEMPLATES:
-                                    self.template_id = random.choice(settings.RANDOM_TEMPLATES_ID)
-                                elif settings.USE_CUSTOM_TEMPLATE:
-                                    self.template_id = settings.CUSTOM_TEMPLATE_ID
-
-                                if settings.USE_NEW_PAINT_METHOD:
-                                    logger.info(f"{self.session_name} | Using the new painting method.")
-                                    reachable()
-                                    inform(self.user_id, self.balance)
-                                    await self.paint(session)
-                                else:
-
-                                    curr_template = await self.get_template(session)
-
-                                    await asyncio.sleep(randint(2, 5))
-                                    subcribed = True
-                                    if not curr_template or curr_template.get('id', 0) != self.template_id:
-                                        subcribed = await self.subscribe_template(session, self.template_id)
-                                        if subcribed:
-                                            logger.success(
-                                                f"{self.session_name} | <green>Successfully subscribed to the template | ID: <cyan>{self.template_id}</cyan></green>")
-                                        await asyncio.sleep(random.randint(2, 5))
-
-                                    if subcribed:
-                                        template_info = await self.get_template_info(session)
-                                        # print(template_info)
-                                        if template_info:
-                                            url = template_info['url']
-                                            img_headers = dict()
-                                            img_headers['Host'] = 'static.notpx.app'
-                                            template_image = await self.get_image(session, url,
-                                                                                  image_headers=img_headers)
-                                            self.default_template = {
-                                                'x': template_info['x'],
-                                                'y': template_info['y'],
-                                                'image_size': template_info['imageSize'],
-                                                'image': template_image,
-                                            }
-                                    if not self.default_template['image']:
-                                        image_url = 'https://app.notpx.app/assets/halloween-DrqzeAH-.png'
-                                        image_headers = headers.copy()
-                                        image_headers['Referer'] = 'https://app.notpx.app/'
-                                        self.default_template['image'] = await self.get_image(session, image_url,
-                                                                                              image_headers=image_headers)
-                                        await asyncio.sleep(random.randint(2, 5))
-
-                                    logger.info(f"{self.session_name} | Using the old painting method.")
-                                    await self.repaintV5(session, template_info=self.default_template)
-
-                                    await asyncio.sleep(random.randint(2, 5))
-
-                            r = random.uniform(2, 4)
-                            if float(self.fromstart) >= self.maxtime / r:
-                                self.claimpx(session)
-                                await asyncio.sleep(random.uniform(2, 5))
-                            if settings.AUTO_TASK:
-                                user_data = self.get_user_data(session)
-                                self.completed_task = list(user_data['tasks'].keys())
-                                if "nikolai" not in self.completed_task:
-                                    res = session.get(f"{API_GAME_ENDPOINT}/mining/task/check/nikolai", headers=headers)
-                                    if res.status_code == 200 and res.json()['nikolai']:
-                                        logger.success(
-                                            f"{self.session_name} | <green>Successfully complete task <cyan>nikolai</cyan>!</green>")
-                                if "pumpkin" not in self.completed_task :
-                                    res = session.get(f"{API_GAME_ENDPOINT}/mining/task/check/pumpkin", headers=headers)
-                                    if res.status_code == 200 and res.json()['pumpkin']:
-                                        logger.success(f"{self.session_name} | <green>Successfully claimed pumpkin!</green>")
-
-                                if "x:notpixel" not in self.completed_task:
-                                    res = session.get(f"{API_GAME_ENDPOINT}/mining/task/check/x?name=notpixel",
-                                                      headers=headers)
-                                    if res.status_code == 200 and res.json()['x:notpixel']:
-                                        logger.success("<green>Task Not pixel on x completed!</green>")
-
-                                if "x:notcoin" not in self.completed_task:
-                                    res = session.get(f"{API_GAME_ENDPOINT}/mining/task/check/x?name=notcoin",
-                                                      headers=headers)
-                                    if res.status_code == 200 and res.json()['x:notcoin']:
-                                        logger.success("<green>Task Not coin on x completed!</green>")
-
-                                if "paint20pixels" not in self.completed_task:
-                                    res = session.get(f"{API_GAME_ENDPOINT}/mining/task/check/paint20pixels",
-                                                      headers=headers)
-                                    if res.status_code == 200 and res.json()['paint20pixels']:
-                                        logger.success("<green>Task paint 20 pixels completed!</green>")
-
-                                if repaints >= 2049 and "leagueBonusPlatinum" not in self.completed_task:
-                                    res = session.get(f"{API_GAME_ENDPOINT}/mining/task/check/leagueBonusPlatinum",
-                                                      headers=headers)
-                                    if res.status_code == 200 and res.json()['leagueBonusPlatinum']:
-                                        logger.success(
-                                            f"{self.session_name} | <green>Upgraded to Plantium league!</green>")
-                                if repaints >= 129 and "leagueBonusGold" not in self.completed_task:
-                                    res = session.get(f"{API_GAME_ENDPOINT}/mining/task/check/leagueBonusGold",
-                                                      headers=headers)
-                                    if res.status_code == 200 and res.json()['leagueBonusGold']:
-                                        logger.success(f"{self.session_name} | <green>Upgraded to Gold league!</green>")
-                                if repaints >= 9 and "leagueBonusSilver" not in self.completed_task:
-                                    res = session.get(f"{API_GAME_ENDPOINT}/mining/task/check/leagueBonusSilver",
-                                                      headers=headers)
-                                    if res.status_code == 200 and res.json()['leagueBonusSilver']:
-                                        logger.success(
-                                            f"{self.session_name} | <green>Upgraded to Silver league!</green>")
-
-                                if "leagueBonusBronze" not in self.completed_task:
-                                    res = session.get(f"{API_GAME_ENDPOINT}/mining/task/check/leagueBonusBronze",
-                                                      headers=headers)
-                                    if res.status_code == 200 and res.json()['leagueBonusBronze']:
-                                        logger.success(f"{self.session_name} | <green>Upgraded to Bronze league!</green>")
-
-
-
-                            if settings.AUTO_UPGRADE_PAINT_REWARD:
-                                if self.is_max_lvl['paintReward'] is False:
-                                    await self.auto_upgrade_paint(session)
-                            if settings.AUTO_UPGRADE_RECHARGE_SPEED:
-                                if self.is_max_lvl['reChargeSpeed'] is False:
-                                    await self.auto_upgrade_recharge_speed(session)
-                            if settings.AUTO_UPGRADE_RECHARGE_ENERGY:
-                                if self.is_max_lvl['energyLimit'] is False:
-                                    await self.auto_upgrade_energy_limit(session)
+        if self.can_run:
+            tg_web_data = await token_manager.get(self.session_name,
+                                                  lambda: self.get_tg_web_data(proxy=proxy))
+            if self.headers.get('Authorization') != f"initData {tg_web_data}":
+                self.headers['Authorization'] = f"initData {tg_web_data}"
+                self.balance = 0
 
-                        else:
-                            logger.warning(f"{self.session_name} | <yellow>Failed to get user data!</yellow>")
+            if await self.anti_detect(session, self.query_anti) is False:
+                return False
 
-                if self.multi_thread:
-                    sleep_ = randint(settings.SLEEP_TIME_BETWEEN_EACH_ROUND[0],
-                                     settings.SLEEP_TIME_BETWEEN_EACH_ROUND[1])
-                    logger.info(f"{self.session_name} | Sleep {sleep_}s...")
-                    await asyncio.sleep(sleep_)
-                else:
-                    await http_client.close()
-                    session.close()
-                    break
-            except InvalidSession as error:
-                raise error
+            elif await self.login(session):
+                self.round_status = await self.get_user_data(session)
+                if not self.round_status:
+                    logger.warning(f"{self.session_name} | <yellow>Failed to get user data!</yellow>")
 
-            except Exception as error:
-                traceback.print_exc()
-                logger.error(f"{self.session_name} | Unknown error: {error}")
-                await asyncio.sleep(delay=randint(60, 120))
+        return True
+
+    async def play_round(self, session: AsyncSession) -> None:
+        """Painting, claiming, tasks and upgrades on the status fetched by :meth:`prepare_round`."""
+        user = self.round_status
+        if not user:
+            return
+
+        self.maxtime = user['maxMiningTime']
+        self.fromstart = user['fromStart']
+        self.balance = int(user['userBalance'])
+        self.user_upgrades = user['boosts']
+        repaints = int(user['repaintsTotal'])
+        user_league = user['league']
+        logger.info(
+            f"{self.session_name} | Pixel Balance: <light-blue>{int(user['userBalance'])}</light-blue> | Pixel available to paint: <cyan>{user['charges']}</cyan> | User league: <yellow>{user_league}</yellow>")
+
+        if settings.USE_PUMPKIN_BOMBS:
+            await self.use_pumpkin(session)
+
+        if user['charges'] > 0:
+            if settings.USE_RANDOM_TEMPLATES:
+                self.template_id = random.choice(settings.RANDOM_TEMPLATES_ID)
+            elif settings.USE_CUSTOM_TEMPLATE:
+                self.template_id = settings.CUSTOM_TEMPLATE_ID
+
+            if settings.USE_NEW_PAINT_METHOD:
+                logger.info(f"{self.session_name} | Using the new painting method.")
+                provider = get_pixel_provider()
+                try:
+                    await provider.reachable()
+                    await provider.inform(self.user_id, self.balance)
+                except ServiceUnavailable as error:
+                    logger.warning(f"{self.session_name} | <yellow>Pixel server unavailable, painting locally: {error}</yellow>")
+                    provider = local_provider
+                await self.paint(session, provider)
+            else:
 
+                curr_template = await self.get_template(session)
+
+                await pace(randint(2, 5))
+                subcribed = True
+                if not curr_template or curr_template.get('id', 0) != self.template_id:
+                    subcribed = await self.subscribe_template(session, self.template_id)
+                    if subcribed:
+                        logger.success(
+                            f"{self.session_name} | <green>Successfully subscribed to the template | ID: <cyan>{self.template_id}</cyan></green>")
+                    await pace(random.randint(2, 5))
+
+                if subcribed:
+                    template_info = await self.get_template_info(session)
+                    # print(template_info)
+                    if template_info:
+                        url = template_info['url']
+                        img_headers = dict()
+                        img_headers['Host'] = 'static.notpx.app'
+                        template_image = await self.get_image(session, url,
+                                                              image_headers=img_headers)
+                        self.default_template = {
+                            'x': template_info['x'],
+                            'y': template_info['y'],
+                            'image_size': template_info['imageSize'],
+                            'image': template_image,
+                            'url': url,
+                        }
+                if not self.default_template['image']:
+                    image_url = f'{settings.APP_ENDPOINT}/assets/halloween-DrqzeAH-.png'
+                    image_headers = self.headers.copy()
+                    image_headers['Referer'] = 'https://app.notpx.app/'
+                    self.default_template['image'] = await self.get_image(session, image_url,
+                                                                          image_headers=image_headers)
+                    self.default_template['url'] = image_url
+                    await pace(random.randint(2, 5))
+
+                logger.info(f"{self.session_name} | Using the old painting method.")
+                await self.repaintV5(session, template_info=self.default_template)
+
+                await pace(random.randint(2, 5))
+
+        r = random.uniform(2, 4)
+        if float(self.fromstart) >= self.maxtime / r:
+            await self.claimpx(session)
+            await pace(random.uniform(2, 5))
+        if settings.AUTO_TASK:
+            user_data = await self.get_user_data(session)
+            self.completed_task = list(user_data['tasks'].keys())
+            if "nikolai" not in self.completed_task:
+                res = await session.get(f"{API_GAME_ENDPOINT}/mining/task/check/nikolai", headers=self.headers)
+                if res.status_code == 200 and res.json()['nikolai']:
+                    logger.success(
+                        f"{self.session_name} | <green>Successfully complete task <cyan>nikolai</cyan>!</green>")
+            if "pumpkin" not in self.completed_task :
+                res = await session.get(f"{API_GAME_ENDPOINT}/mining/task/check/pumpkin", headers=self.headers)
+                if res.status_code == 200 and res.json()['pumpkin']:
+                    logger.success(f"{self.session_name} | <green>Successfully claimed pumpkin!</green>")
+
+            if "x:notpixel" not in self.completed_task:
+                res = await session.get(f"{API_GAME_ENDPOINT}/mining/task/check/x?name=notpixel",
+                                        headers=self.headers)
+                if res.status_code == 200 and res.json()['x:notpixel']:
+                    logger.success("<green>Task Not pixel on x completed!</green>")
+
+            if "x:notcoin" not in self.completed_task:
+                res = await session.get(f"{API_GAME_ENDPOINT}/mining/task/check/x?name=notcoin",
+                                        headers=self.headers)
+                if res.status_code == 200 and res.json()['x:notcoin']:
+                    logger.success("<green>Task Not coin on x completed!</green>")
+
+            if "paint20pixels" not in self.completed_task:
+                res = await session.get(f"{API_GAME_ENDPOINT}/mining/task/check/paint20pixels",
+                                        headers=self.headers)
+                if res.status_code == 200 and res.json()['paint20pixels']:
+                    logger.success("<green>Task paint 20 pixels completed!</green>")
+
+            if repaints >= 2049 and "leagueBonusPlatinum" not in self.completed_task:
+                res = await session.get(f"{API_GAME_ENDPOINT}/mining/task/check/leagueBonusPlatinum",
+                                        headers=self.headers)
+                if res.status_code == 200 and res.json()['leagueBonusPlatinum']:
+                    logger.success(
+                        f"{self.session_name} | <green>Upgraded to Plantium league!</green>")
+            if repaints >= 129 and "leagueBonusGold" not in self.completed_task:
+                res = await session.get(f"{API_GAME_ENDPOINT}/mining/task/check/leagueBonusGold",
+                                        headers=self.headers)
+                if res.status_code == 200 and res.json()['leagueBonusGold']:
+                    logger.success(f"{self.session_name} | <green>Upgraded to Gold league!</green>")
+            if repaints >= 9 and "leagueBonusSilver" not in self.completed_task:
+                res = await session.get(f"{API_GAME_ENDPOINT}/mining/task/check/leagueBonusSilver",
+                                        headers=self.headers)
+                if res.status_code == 200 and res.json()['leagueBonusSilver']:
+                    logger.success(
+                        f"{self.session_name} | <green>Upgraded to Silver league!</green>")
 
-async def run_tapper(tg_client: Client, proxy: str | None, ua: str):
+            if "leagueBonusBronze" not in self.completed_task:
+                res = await session.get(f"{API_GAME_ENDPOINT}/mining/task/check/leagueBonusBronze",
+                                        headers=self.headers)
+                if res.status_code == 200 and res.json()['leagueBonusBronze']:
+                    logger.success(f"{self.session_name} | <green>Upgraded to Bronze league!</green>")
+
+
+
+        if settings.AUTO_UPGRADE_PAINT_REWARD:
+            if self.is_max_lvl['paintReward'] is False:
+                await self.auto_upgrade_paint(session)
+        if settings.AUTO_UPGRADE_RECHARGE_SPEED:
+            if self.is_max_lvl['reChargeSpeed'] is False:
+                await self.auto_upgrade_recharge_speed(session)
+        if settings.AUTO_UPGRADE_RECHARGE_ENERGY:
+            if self.is_max_lvl['energyLimit'] is False:
+                await self.auto_upgrade_energy_limit(session)
+
+        if settings.WAKEUP_MODE == "charges":
+            # Charges and mining time as they are after this round, for next_round_delay.
+            await self.get_user_data(session)
+
+    async def run_round(self, session: AsyncSession, proxy: str | None) -> bool:
+        """One pass of checks, painting, claiming, tasks and upgrades. False means retry shortly."""
+        if not await self.prepare_round(session, proxy):
+            return False
+        await self.play_round(session)
+        return True
+
+
+def tapper_job(tg_client: Client, proxy: str | None, ua: str, pool: ConnectionPool | None = None) -> AccountJob:
+    return AccountJob(Tapper(tg_client=tg_client, multi_thread=True, pool=pool), proxy=proxy, ua=ua)
+
+
+async def run_tapper1(tg_clients: list[Client], pool: ConnectionPool | None = None):
+    pipeline = Pipeline([AccountJob(Tapper(tg_client=tg_client, multi_thread=False, pool=pool),
+                                    proxy=await account_store.get_proxy(tg_client.name),
+                                    ua=await account_store.get_user_agent(tg_client.name))
+                         for tg_client in tg_clients])
     try:
-        sleep_ = randint(1, 15)
-        logger.info(f"{tg_client.name} | start after {sleep_}s")
-        await asyncio.sleep(sleep_)
-        await Tapper(tg_client=tg_client, multi_thread=True).run(proxy=proxy, ua=ua)
-    except InvalidSession:
-        logger.error(f"{tg_client.name} | Invalid Session")
-
-
-async def get_user_agent(session_name):
-    async with AIOFile('user_agents.json', 'r') as file:
-        content = await file.read()
-        user_agents = json.loads(content)
-
-    if session_name not in list(user_agents.keys()):
-        logger.info(f"{session_name} | Doesn't have user agent, Creating...")
-        ua = generate_random_user_agent(device_type='android', browser_type='chrome')
-        user_agents.update({session_name: ua})
-        async with AIOFile('user_agents.json', 'w') as file:
-            content = json.dumps(user_agents, indent=4)
-            await file.write(content)
-        return ua
-    else:
-        logger.info(f"{session_name} | Loading user agent from cache...")
-        return user_agents[session_name]
-
-async def run_tapper1(tg_clients: list[Client]):
-    while True:
-        for tg_client in tg_clients:
-            try:
-                await Tapper(tg_client=tg_client, multi_thread=False).run(
-                    proxy=await lc.get_proxy(tg_client.name), ua=await get_user_agent(tg_client.name))
-            except InvalidSession:
-                logger.error(f"{tg_client.name} | Invalid Session")
+        while True:
+            await pipeline.run_pass()
 
-            sleep_ = randint(settings.DELAY_EACH_ACCOUNT[0], settings.DELAY_EACH_ACCOUNT[1])
-            logger.info(f"Sleep {sleep_}s...")
+            sleep_ = randint(settings.SLEEP_TIME_BETWEEN_EACH_ROUND[0], settings.SLEEP_TIME_BETWEEN_EACH_ROUND[1])
+            logger.info(f"<red>Sleep {sleep_}s...</red>")
             await asyncio.sleep(sleep_)
-
-        sleep_ = randint(settings.SLEEP_TIME_BETWEEN_EACH_ROUND[0], settings.SLEEP_TIME_BETWEEN_EACH_ROUND[1])
-        logger.info(f"<red>Sleep {sleep_}s...</red>")
-        await asyncio.sleep(sleep_)
+    finally:
+        await pipeline.close()
@@ -0,0 +1,136 @@
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from PIL import Image
+
+from bot.config import settings
+from bot.core.canvas import TemplateGrid
+from bot.utils import logger
+
+
+def image_nbytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+class TemplateStore:
+    """
+    Process-wide cache of decoded template images, keyed by template id or image URL.
+
+    Every Tapper painting the same template gets the same decoded image, so a template is read and
+    decoded once per process instead of once per account per round. Concurrent misses for one key
+    share a single load. Entries are evicted least-recently-used once either ``max_entries`` or
+    ``max_bytes`` (decoded size) is exceeded. Cached images are shared: callers must not modify them.
+
+    The palette-indexed ``TemplateGrid`` for each placement of an image is cached alongside it and
+    evicted with it.
+    """
+
+    def __init__(self, max_entries: int = 16, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, Image.Image] = OrderedDict()
+        self._grids: dict[str, dict[tuple[int, int, int], TemplateGrid]] = {}
+        self._loading: dict[str, asyncio.Future] = {}
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key) -> bool:
+        return str(key) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def peek(self, key) -> Image.Image | None:
+        image = self._entries.get(str(key))
+        if image is not None:
+            self._entries.move_to_end(str(key))
+        return image
+
+    def put(self, key, image: Image.Image) -> Image.Image:
+        key = str(key)
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = image
+        self._nbytes += image_nbytes(image)
+        self._evict()
+        return image
+
+    def _evict(self) -> None:
+        # Always keep the newest entry, even if it alone is over the byte budget.
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._nbytes > self.max_bytes):
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        self._nbytes -= image_nbytes(self._entries.pop(key))
+        for grid in self._grids.pop(key, {}).values():
+            self._nbytes -= grid.nbytes
+
+    def grid(self, key, x: int, y: int, size: int) -> TemplateGrid | None:
+        """Palette-indexed grid of the cached image ``key`` placed at ``(x, y)``, built on first use."""
+        key = str(key)
+        image = self.peek(key)
+        if image is None:
+            return None
+        grids = self._grids.setdefault(key, {})
+        grid = grids.get((x, y, size))
+        if grid is None:
+            grid = grids[(x, y, size)] = TemplateGrid.from_image(image, x, y, size)
+            self._nbytes += grid.nbytes
+            self._evict()
+        return grid
+
+    async def get(self, key, loader: Callable[[], Awaitable[Image.Image | None]]) -> Image.Image | None:
+        """Return the cached image for ``key``, calling ``loader`` once on a miss. Failed loads are not cached."""
+        key = str(key)
+        image = self.peek(key)
+        if image is not None:
+            self.hits += 1
+            return image
+
+        pending = self._loading.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            image = await loader()
+            if image is not None:
+                image.load()
+                self.put(key, image)
+            future.set_result(image)
+            return image
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            # Nobody else may be waiting; mark the exception as retrieved.
+            future.exception()
+            raise
+        finally:
+            del self._loading[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._grids.clear()
+        self._nbytes = 0
+
+    def log_stats(self) -> None:
+        logger.info(f"Templates | cached: <cyan>{len(self._entries)}</cyan> ({self._nbytes / 1024 / 1024:.1f} MB) | "
+                    f"hits: <green>{self.hits}</green> | misses: <yellow>{self.misses}</yellow> | "
+                    f"evicted: {self.evictions}")
+
+
+template_store = TemplateStore(max_entries=settings.TEMPLATE_CACHE_SIZE,
+                               max_bytes=settings.TEMPLATE_CACHE_MAX_MB * 1024 * 1024)
@@ -1,2 +1,18 @@
 class InvalidSession(BaseException):
     ...
+
+
+class RequestError(Exception):
+    """Raised when an HTTP request could not be completed (connection, proxy or timeout failure)."""
+
+    def __init__(self, message: str, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+class HTTPError(RequestError):
+    """Raised by ``Response.raise_for_status`` for 4xx/5xx responses."""
+
+
+class ServiceUnavailable(RequestError):
+    """Raised when a service keeps failing past its retry policy or its circuit breaker is open."""
@@ -0,0 +1 @@
+from .server import MockConfig, create_app, endpoint_settings, start
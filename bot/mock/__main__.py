@@ -0,0 +1,47 @@
+import argparse
+import asyncio
+from contextlib import suppress
+
+from bot.utils import logger
+from .server import MockConfig, endpoint_settings, start
+
+
+async def main():
+    parser = argparse.ArgumentParser(prog="python -m bot.mock", description="Local stand-in for the NotPixel API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=MockConfig.latency, help="Base seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=MockConfig.jitter, help="Random extra latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=MockConfig.error_rate, help="Share of game API calls that fail")
+    parser.add_argument("--error-status", type=int, default=MockConfig.error_status, help="Status of injected failures")
+    parser.add_argument("--max-charges", type=int, default=MockConfig.max_charges)
+    parser.add_argument("--recharge-seconds", type=float, default=MockConfig.recharge_seconds, help="Seconds per charge")
+    parser.add_argument("--max-mining-time", type=int, default=MockConfig.max_mining_time, help="Seconds until mining storage is full")
+    parser.add_argument("--mining-speed", type=float, default=MockConfig.mining_speed, help="PX mined per second")
+    parser.add_argument("--template-size", type=int, default=MockConfig.template_size, help="Side of generated templates in pixels")
+    parser.add_argument("--snapshot-interval", type=float, default=MockConfig.snapshot_interval,
+                        help="Seconds a canvas snapshot is served before it is re-encoded")
+    parser.add_argument("--default-template", type=int, default=MockConfig.default_template,
+                        help="Template the coordinator hands to accounts without one")
+    parser.add_argument("--seed", type=int, default=MockConfig.seed)
+    args = parser.parse_args()
+
+    config = MockConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                        error_status=args.error_status, max_charges=args.max_charges,
+                        recharge_seconds=args.recharge_seconds, max_mining_time=args.max_mining_time,
+                        mining_speed=args.mining_speed, template_size=args.template_size,
+                        snapshot_interval=args.snapshot_interval, default_template=args.default_template,
+                        seed=args.seed)
+    runner = await start(config, args.host, args.port)
+    logger.info(f"Mock NotPixel server listening on <cyan>http://{args.host}:{args.port}</cyan>. Point the bot at it with:")
+    for key, value in endpoint_settings(f"http://{args.host}:{args.port}").items():
+        print(f"{key}={value}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    with suppress(KeyboardInterrupt):
+        asyncio.run(main())
@@ -0,0 +1,365 @@
+import asyncio
+import hashlib
+import io
+import json
+import random
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from aiohttp import web
+from PIL import Image
+
+from bot.core.canvas import CANVAS_SIZE, PALETTE, PALETTE_INDEX, PALETTE_RGB
+from bot.utils.ps import apis, baseUrl
+
+BUNDLE_NAME = "index-mock.js"
+HALLOWEEN_ASSET = "halloween-DrqzeAH-.png"
+BOOSTS = ("energyLimit", "paintReward", "reChargeSpeed")
+MAX_BOOST_LEVEL = {"energyLimit": 7, "paintReward": 7, "reChargeSpeed": 11}
+
+
+@dataclass
+class MockConfig:
+    """Behaviour of the stand-in server; every knob is also a command line option of ``python -m bot.mock``."""
+
+    latency: float = 0.05
+    jitter: float = 0.05
+    error_rate: float = 0.0
+    error_status: int = 504
+    max_charges: int = 24
+    recharge_seconds: float = 10
+    max_mining_time: int = 7200
+    mining_speed: float = 0.05
+    template_size: int = 64
+    snapshot_interval: float = 1.0
+    default_template: int = 1006282664
+    seed: int = 0
+
+
+@dataclass
+class MockUser:
+    id: int
+    balance: float = 0.0
+    charges: int = 0
+    recharged_at: float = field(default_factory=time.time)
+    mining_since: float = field(default_factory=time.time)
+    repaints: int = 0
+    boosts: dict = field(default_factory=lambda: {boost: 1 for boost in BOOSTS})
+    tasks: dict = field(default_factory=dict)
+    goods: dict = field(default_factory=dict)
+    template: int | None = None
+
+
+class MockState:
+    """
+    Accounts, canvas and templates of the stand-in server, all in memory.
+
+    Accounts are keyed by their ``Authorization`` header and created on first use with full charges.
+    Charges come back one every ``recharge_seconds`` (shorter with the ``reChargeSpeed`` boost) up to
+    ``max_charges``, and are brought up to date whenever the account is read.
+    """
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.users: dict[str, MockUser] = {}
+        self.canvas = np.full((CANVAS_SIZE, CANVAS_SIZE), PALETTE_INDEX["#FFFFFF"], dtype=np.uint8)
+        self.templates: dict[int, tuple[int, int, bytes]] = {}
+        self.requests = 0
+        self.paints = 0
+        self.errors = 0
+        self._snapshot: bytes | None = None
+        self._snapshot_at = 0.0
+
+    def user(self, authorization: str) -> MockUser:
+        user = self.users.get(authorization)
+        if user is None:
+            user_id = int(hashlib.sha256(authorization.encode()).hexdigest()[:8], 16)
+            user = self.users[authorization] = MockUser(id=user_id, charges=self.max_charges(None))
+        self.recharge(user)
+        return user
+
+    def max_charges(self, user: MockUser | None) -> int:
+        return self.config.max_charges + (user.boosts["energyLimit"] - 1 if user else 0)
+
+    def recharge_period(self, user: MockUser) -> float:
+        return self.config.recharge_seconds / (1 + 0.1 * (user.boosts["reChargeSpeed"] - 1))
+
+    def recharge(self, user: MockUser) -> None:
+        now = time.time()
+        max_charges = self.max_charges(user)
+        if user.charges >= max_charges:
+            user.recharged_at = now
+            return
+        period = self.recharge_period(user)
+        gained = int((now - user.recharged_at) // period)
+        if gained:
+            user.charges = min(max_charges, user.charges + gained)
+            user.recharged_at = now if user.charges >= max_charges else user.recharged_at + gained * period
+
+    def mined(self, user: MockUser) -> float:
+        elapsed = min(time.time() - user.mining_since, self.config.max_mining_time)
+        return elapsed * self.config.mining_speed
+
+    def status(self, user: MockUser) -> dict:
+        period = self.recharge_period(user)
+        from_start = min(time.time() - user.mining_since, self.config.max_mining_time)
+        return {
+            "coins": round(self.mined(user), 3),
+            "speedPerSecond": self.config.mining_speed,
+            "fromStart": int(from_start),
+            "maxMiningTime": self.config.max_mining_time,
+            "claimed": 0,
+            "boosts": dict(user.boosts),
+            "repaintsTotal": user.repaints,
+            "userBalance": round(user.balance, 3),
+            "activated": True,
+            "league": "bronze",
+            "charges": user.charges,
+            "maxCharges": self.max_charges(user),
+            "reChargeTimer": int(max(0.0, period - (time.time() - user.recharged_at)) * 1000),
+            "reChargeSpeed": int(period * 1000),
+            "goods": dict(user.goods),
+            "tasks": dict(user.tasks),
+        }
+
+    def paint(self, user: MockUser, pixel_id: int, color: str) -> bool:
+        if user.charges <= 0 or color not in PALETTE_INDEX or not 1 <= pixel_id <= CANVAS_SIZE * CANVAS_SIZE:
+            return False
+        if user.charges >= self.max_charges(user):
+            user.recharged_at = time.time()
+        user.charges -= 1
+        y, x = divmod(pixel_id - 1, CANVAS_SIZE)
+        self.canvas[y, x] = PALETTE_INDEX[color]
+        user.balance += user.boosts["paintReward"]
+        user.repaints += 1
+        self.paints += 1
+        return True
+
+    def template(self, template_id: int) -> tuple[int, int, bytes]:
+        """Position and PNG of a template, generated deterministically from its id."""
+        template = self.templates.get(template_id)
+        if template is None:
+            rng = np.random.default_rng(template_id)
+            size = self.config.template_size
+            x, y = (int(value) for value in rng.integers(0, CANVAS_SIZE - size, 2))
+            indices = rng.integers(0, len(PALETTE), (size // 8, size // 8)).repeat(8, axis=0).repeat(8, axis=1)
+            template = self.templates[template_id] = (x, y, _png(indices))
+        return template
+
+    def snapshot(self) -> bytes:
+        now = time.monotonic()
+        if self._snapshot is None or now - self._snapshot_at >= self.config.snapshot_interval:
+            self._snapshot = _png(self.canvas)
+            self._snapshot_at = now
+        return self._snapshot
+
+    def uncolored(self, template_id: int, count: int) -> list[dict]:
+        x, y, png = self.template(template_id)
+        with Image.open(io.BytesIO(png)) as image:
+            wanted = np.asarray(image.convert("RGB"), dtype=np.int32)
+        size = wanted.shape[0]
+        current = PALETTE_RGB[self.canvas[y:y + size, x:x + size]]
+        rows, cols = np.nonzero((current != wanted).any(axis=2))
+        picks = self.random.sample(range(len(rows)), min(count, len(rows)))
+        return [{"coords": (y + int(rows[i])) * CANVAS_SIZE + x + int(cols[i]) + 1,
+                 "color": "#%02X%02X%02X" % tuple(wanted[rows[i], cols[i]])} for i in picks]
+
+
+def _png(indices: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(PALETTE_RGB[indices].astype(np.uint8), "RGB").save(buffer, format="PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def _bundle() -> str:
+    # Just enough of the app bundle for bot.utils.ps to find the base URL and every endpoint.
+    calls = "".join(f'e.get("{api}");' for api in apis)
+    return f'const Ne="{baseUrl}";{calls}\n'
+
+
+def create_app(config: MockConfig | None = None) -> web.Application:
+    config = config or MockConfig()
+    state = MockState(config)
+
+    @web.middleware
+    async def network(request: web.Request, handler):
+        state.requests += 1
+        if config.latency or config.jitter:
+            await asyncio.sleep(config.latency + state.random.uniform(0, config.jitter))
+        if request.path.startswith("/api/v1/") and state.random.random() < config.error_rate:
+            state.errors += 1
+            return web.Response(status=config.error_status, text=f"{config.error_status} injected")
+        return await handler(request)
+
+    def current_user(request: web.Request) -> MockUser:
+        authorization = request.headers.get("Authorization", "")
+        if not authorization.startswith("initData "):
+            raise web.HTTPUnauthorized(text=json.dumps({"error": "unauthorized"}), content_type="application/json")
+        return state.user(authorization)
+
+    def template_info(request: web.Request, template_id: int) -> dict:
+        x, y, _ = state.template(template_id)
+        return {"id": template_id, "x": x, "y": y, "imageSize": config.template_size,
+                "url": f"{request.url.origin()}/static/templates/{template_id}.png"}
+
+    # Game API
+    async def users_me(request):
+        user = current_user(request)
+        return web.json_response({"id": user.id, "firstName": f"mock{user.id}", "balance": user.balance})
+
+    async def mining_status(request):
+        return web.json_response(state.status(current_user(request)))
+
+    async def mining_claim(request):
+        user = current_user(request)
+        claimed = round(state.mined(user), 3)
+        user.balance += claimed
+        user.mining_since = time.time()
+        return web.json_response({"claimed": claimed})
+
+    async def repaint_start(request):
+        user = current_user(request)
+        data = await request.json()
+        if not state.paint(user, int(data.get("pixelId", 0)), data.get("newColor", "")):
+            return web.json_response({"error": "insufficient charges"}, status=400)
+        return web.json_response({"balance": round(user.balance, 3)})
+
+    async def repaint_special(request):
+        user = current_user(request)
+        data = await request.json()
+        bomb = str(data.get("type"))
+        if user.goods.get(bomb, 0) <= 0:
+            return web.json_response({"error": "no goods"}, status=400)
+        user.goods[bomb] -= 1
+        user.balance += 196
+        return web.json_response({})
+
+    async def template_my(request):
+        user = current_user(request)
+        if user.template is None:
+            return web.json_response({"error": "not subscribed"}, status=404)
+        return web.json_response(template_info(request, user.template))
+
+    async def template_subscribe(request):
+        current_user(request).template = int(request.match_info["template_id"])
+        return web.Response(status=204)
+
+    async def template_get(request):
+        current_user(request)
+        return web.json_response(template_info(request, int(request.match_info["template_id"])))
+
+    async def boost_check(request):
+        user = current_user(request)
+        boost = request.match_info["boost"]
+        if boost not in user.boosts:
+            return web.json_response({"error": "unknown boost"}, status=400)
+        price = 5 * 2 ** user.boosts[boost]
+        if user.boosts[boost] >= MAX_BOOST_LEVEL[boost] or user.balance < price:
+            return web.json_response({"error": "insufficient balance"}, status=400)
+        user.balance -= price
+        user.boosts[boost] += 1
+        return web.json_response({boost: True})
+
+    async def task_check(request):
+        user = current_user(request)
+        task = request.match_info["task"]
+        if "name" in request.query:
+            task = f"{task}:{request.query['name']}"
+        user.tasks[task] = True
+        return web.json_response({task: True})
+
+    # Static assets
+    async def app_index(request):
+        return web.Response(text=f'<!doctype html><html><head><script type="module" crossorigin '
+                                 f'src="/assets/{BUNDLE_NAME}"></script></head><body></body></html>',
+                            content_type="text/html", headers={"ETag": '"mock-index"'})
+
+    async def app_bundle(request):
+        if request.headers.get("If-None-Match") == '"mock-bundle"':
+            return web.Response(status=304)
+        return web.Response(text=_bundle(), content_type="application/javascript", headers={"ETag": '"mock-bundle"'})
+
+    async def halloween(request):
+        return web.Response(body=state.template(0)[2], content_type="image/png")
+
+    async def template_image(request):
+        template_id = int(request.match_info["template_id"])
+        return web.Response(body=state.template(template_id)[2], content_type="image/png")
+
+    async def canvas_image(request):
+        return web.Response(body=state.snapshot(), content_type="image/png")
+
+    # Pixel coordinator (image_checker.ENDPOINT)
+    async def is_reachable(request):
+        return web.json_response({"uuid": "mock"})
+
+    async def info(request):
+        return web.json_response({"ok": True})
+
+    async def get_pixel(request):
+        pixels = state.uncolored(int(request.query["template"]), 1)
+        if not pixels:
+            return web.json_response({"error": "nothing to paint"}, status=404)
+        return web.json_response(pixels[0])
+
+    async def get_pixels(request):
+        return web.json_response(state.uncolored(int(request.query["template"]), int(request.query.get("count", 1))))
+
+    async def get_uncolored(request):
+        template = int(request.query.get("template") or 0)
+        return web.json_response({"template": template or config.default_template})
+
+    # Third parties the bot talks to
+    async def analytics_event(request):
+        return web.Response(status=202, text="ok")
+
+    async def mock_stats(request):
+        return web.json_response({"requests": state.requests, "paints": state.paints, "errors": state.errors,
+                                  "users": len(state.users)})
+
+    app = web.Application(middlewares=[network])
+    app["state"] = state
+    app.router.add_get("/api/v1/users/me", users_me)
+    app.router.add_get("/api/v1/mining/status", mining_status)
+    app.router.add_get("/api/v1/mining/claim", mining_claim)
+    app.router.add_post("/api/v1/repaint/start", repaint_start)
+    app.router.add_post("/api/v1/repaint/special", repaint_special)
+    app.router.add_get("/api/v1/image/template/my", template_my)
+    app.router.add_put("/api/v1/image/template/subscribe/{template_id:\\d+}", template_subscribe)
+    app.router.add_get("/api/v1/image/template/{template_id:\\d+}", template_get)
+    app.router.add_get("/api/v1/mining/boost/check/{boost}", boost_check)
+    app.router.add_get("/api/v1/mining/task/check/{task}", task_check)
+    app.router.add_get("/", app_index)
+    app.router.add_get(f"/assets/{BUNDLE_NAME}", app_bundle)
+    app.router.add_get(f"/assets/{HALLOWEEN_ASSET}", halloween)
+    app.router.add_get("/static/templates/{template_id:\\d+}.png", template_image)
+    app.router.add_get("/api/v2/image", canvas_image)
+    app.router.add_get("/is_reacheble/", is_reachable)
+    app.router.add_put("/info/", info)
+    app.router.add_get("/get_pixel/", get_pixel)
+    app.router.add_get("/get_pixels/", get_pixels)
+    app.router.add_get("/get_uncolored/", get_uncolored)
+    app.router.add_post("/api/event", analytics_event)
+    app.router.add_get("/mock/stats", mock_stats)
+    return app
+
+
+def endpoint_settings(base_url: str) -> dict[str, str]:
+    """Settings that point the bot at a stand-in server listening on ``base_url``."""
+    return {
+        "API_GAME_ENDPOINT": f"{base_url}/api/v1",
+        "APP_ENDPOINT": base_url,
+        "IMAGE_ENDPOINT": base_url,
+        "PIXEL_SERVER_ENDPOINT": base_url,
+        "ANALYTICS_ENDPOINT": base_url,
+    }
+
+
+async def start(config: MockConfig | None = None, host: str = "127.0.0.1", port: int = 8080) -> web.AppRunner:
+    """Start the stand-in server on the running loop; stop it with ``await runner.cleanup()``."""
+    runner = web.AppRunner(create_app(config), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+from urllib.parse import unquote
+
+from better_proxy import Proxy
+
+from bot.config import settings
+from bot.core.agents import generate_random_user_agent
+from bot.utils import logger
+
+
+def get_proxies() -> list[Proxy]:
+    if settings.USE_PROXY_FROM_FILE:
+        with open(file="bot/config/proxies.txt", encoding="utf-8-sig") as file:
+            proxies = [Proxy.from_str(proxy=row.strip()).as_url for row in file]
+    else:
+        proxies = []
+
+    return proxies
+
+
+def fetch_username(query):
+    try:
+        fetch_data = unquote(query).split("user=")[1].split("&chat_instance=")[0]
+        json_data = json.loads(fetch_data)
+        return json_data['username']
+    except:
+        try:
+            fetch_data = unquote(query).split("user=")[1].split("&auth_date=")[0]
+            json_data = json.loads(fetch_data)
+            return json_data['username']
+        except:
+            try:
+                fetch_data = unquote(unquote(query)).split("user=")[1].split("&auth_date=")[0]
+                json_data = json.loads(fetch_data)
+                return json_data['username']
+            except:
+                logger.warning(f"Invaild query: {query}")
+                return ""
+
+
+def _read_json(path: str) -> dict:
+    try:
+        with open(path, "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+    except ValueError as error:
+        logger.warning(f"Could not parse {path}: {error}")
+        return {}
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(data, file, indent=4)
+    os.replace(tmp_path, path)
+
+
+class AccountStore:
+    """
+    In-memory view of ``user_agents.json`` and ``proxy.json`` shared by every account.
+
+    Each file is read once on first use. New entries are written back in one batch ``flush_delay``
+    seconds after the first change, through a temp file and an atomic rename, so startup stays linear in
+    the number of sessions and concurrent accounts can't overwrite each other's entries.
+    """
+
+    def __init__(self, user_agents_path: str = "user_agents.json", proxies_path: str = "proxy.json",
+                 flush_delay: float = 1.0):
+        self.paths = {"user_agents": user_agents_path, "proxies": proxies_path}
+        self.flush_delay = flush_delay
+        self._data: dict[str, dict] = {}
+        self._dirty: set[str] = set()
+        self._flush_task: asyncio.Task | None = None
+        self._free_proxies: list[str] | None = None
+
+    def _get(self, name: str) -> dict:
+        data = self._data.get(name)
+        if data is None:
+            data = self._data[name] = _read_json(self.paths[name])
+        return data
+
+    def _set(self, name: str, key: str, value) -> None:
+        self._get(name)[key] = value
+        self._dirty.add(name)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def get_user_agent(self, session_name: str) -> str:
+        user_agents = self._get("user_agents")
+        if session_name not in user_agents:
+            logger.info(f"{session_name} | Doesn't have user agent, Creating...")
+            ua = generate_random_user_agent(device_type='android', browser_type='chrome')
+            self._set("user_agents", session_name, ua)
+            return ua
+        else:
+            logger.info(f"{session_name} | Loading user agent from cache...")
+            return user_agents[session_name]
+
+    async def get_proxy(self, session_name: str) -> str | None:
+        if not settings.USE_PROXY_FROM_FILE:
+            return None
+
+        proxies = self._get("proxies")
+        if session_name not in proxies:
+            logger.info(f"{session_name} | Doesn't bind with any proxy, binding to a new proxy...")
+            proxy = self._next_free_proxy(proxies)
+            self._set("proxies", session_name, proxy)
+            return proxy
+        else:
+            logger.info(f"{session_name} | Loading proxy from cache...")
+            return proxies[session_name]
+
+    def _next_free_proxy(self, proxies: dict) -> str | None:
+        if self._free_proxies is None:
+            used = set(proxies.values())
+            self._free_proxies = [proxy for proxy in reversed(get_proxies()) if proxy not in used]
+        return self._free_proxies.pop() if self._free_proxies else None
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Write every changed file now."""
+        while self._dirty:
+            name = self._dirty.pop()
+            try:
+                await asyncio.to_thread(_write_json, self.paths[name], dict(self._data[name]))
+            except OSError as error:
+                logger.warning(f"Error saving {self.paths[name]}: {error}")
+
+
+account_store = AccountStore()
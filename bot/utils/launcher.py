@@ -1,23 +1,29 @@
-import json
 import os
 import glob
 import asyncio
 import argparse
 import sys
 import subprocess
+from random import randint
 from colorama import Fore, Style
-from urllib.parse import unquote
 
-from aiofile import AIOFile
 from pyrogram import Client
-from better_proxy import Proxy
 
 from bot.config import settings
-from bot.core.agents import generate_random_user_agent
 from bot.utils import logger
-from bot.core.tapper import run_tapper, run_tapper1
-from bot.core.query import run_query_tapper, run_query_tapper1
+from bot.core.tapper import run_tapper1, tapper_job
+from bot.core.query import run_query_tapper1, query_tapper_job
 from bot.core.registrator import register_sessions
+from bot.core.http_client import ConnectionPool
+from bot.core.ratelimit import rate_limiter
+from bot.core.templates import template_store
+from bot.core.allocator import allocator
+from bot.core.auth import token_manager
+from bot.core.metrics import fleet_metrics
+from bot.core.scheduler import Scheduler
+from bot.core import image_checker
+from bot.utils.ps import version_checker
+from bot.utils.accounts import account_store, fetch_username, get_proxies
 
 
 start_text = """
@@ -49,16 +55,6 @@ def get_session_names() -> list[str]:
     return session_names
 
 
-def get_proxies() -> list[Proxy]:
-    if settings.USE_PROXY_FROM_FILE:
-        with open(file="bot/config/proxies.txt", encoding="utf-8-sig") as file:
-            proxies = [Proxy.from_str(proxy=row.strip()).as_url for row in file]
-    else:
-        proxies = []
-
-    return proxies
-
-
 async def get_tg_clients() -> list[Client]:
     global tg_clients
 
@@ -84,70 +80,6 @@ async def get_tg_clients() -> list[Client]:
 
     return tg_clients
 
-def fetch_username(query):
-    try:
-        fetch_data = unquote(query).split("user=")[1].split("&chat_instance=")[0]
-        json_data = json.loads(fetch_data)
-        return json_data['username']
-    except:
-        try:
-            fetch_data = unquote(query).split("user=")[1].split("&auth_date=")[0]
-            json_data = json.loads(fetch_data)
-            return json_data['username']
-        except:
-            try:
-                fetch_data = unquote(unquote(query)).split("user=")[1].split("&auth_date=")[0]
-                json_data = json.loads(fetch_data)
-                return json_data['username']
-            except:
-                logger.warning(f"Invaild query: {query}")
-                return ""
-
-async def get_user_agent(session_name):
-    async with AIOFile('user_agents.json', 'r') as file:
-        content = await file.read()
-        user_agents = json.loads(content)
-
-    if session_name not in list(user_agents.keys()):
-        logger.info(f"{session_name} | Doesn't have user agent, Creating...")
-        ua = generate_random_user_agent(device_type='android', browser_type='chrome')
-        user_agents.update({session_name: ua})
-        async with AIOFile('user_agents.json', 'w') as file:
-            content = json.dumps(user_agents, indent=4)
-            await file.write(content)
-        return ua
-    else:
-        logger.info(f"{session_name} | Loading user agent from cache...")
-        return user_agents[session_name]
-
-def get_un_used_proxy(used_proxies: list[Proxy]):
-    proxies = get_proxies()
-    for proxy in proxies:
-        if proxy not in used_proxies:
-            return proxy
-    return None
-
-async def get_proxy(session_name):
-    if settings.USE_PROXY_FROM_FILE:
-        async with AIOFile('proxy.json', 'r') as file:
-            content = await file.read()
-            proxies = json.loads(content)
-
-        if session_name not in list(proxies.keys()):
-            logger.info(f"{session_name} | Doesn't bind with any proxy, binding to a new proxy...")
-            used_proxies = [proxy for proxy in proxies.values()]
-            proxy = get_un_used_proxy(used_proxies)
-            proxies.update({session_name: proxy})
-            async with AIOFile('proxy.json', 'w') as file:
-                content = json.dumps(proxies, indent=4)
-                await file.write(content)
-            return proxy
-        else:
-            logger.info(f"{session_name} | Loading proxy from cache...")
-            return proxies[session_name]
-    else:
-        return None
-
 async def process() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("-a", "--action", type=int, help="Action to perform")
@@ -193,7 +125,8 @@ async def process() -> None:
             await run_tasks(tg_clients=tg_clients)
         else:
             tg_clients = await get_tg_clients()
-            await run_tapper1(tg_clients=tg_clients)
+            fleet_metrics.start(len(tg_clients))
+            await run_tapper1(tg_clients=tg_clients, pool=create_pool())
     elif action == 3:
         if ans is None:
             while True:
@@ -211,7 +144,8 @@ async def process() -> None:
             with open("data.txt", "r") as f:
                 query_ids = [line.strip() for line in f.readlines()]
 
-            await run_query_tapper1(query_ids)
+            fleet_metrics.start(len(query_ids))
+            await run_query_tapper1(query_ids, pool=create_pool())
 
     elif action == 4:
         same_dir_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "idx.py"))
@@ -219,29 +153,99 @@ async def process() -> None:
         if os.path.exists(same_dir_path):
             subprocess.run([sys.executable, same_dir_path])
 
+def create_pool() -> ConnectionPool:
+    return ConnectionPool(limit=settings.HTTP_POOL_LIMIT, limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST)
+
+
+async def report_stats(pool: ConnectionPool, interval: float, scheduler: Scheduler | None = None):
+    while True:
+        await asyncio.sleep(interval)
+        pool.log_stats()
+        template_store.log_stats()
+        allocator.log_stats()
+        token_manager.log_stats()
+        rate_limiter.log_stats()
+        fleet_metrics.log_stats()
+        if scheduler is not None:
+            scheduler.log_stats()
+
+
+async def start_fleet(accounts: list, prepare, start, workers: int, name=str) -> None:
+    """
+    Prepare ``accounts`` on up to ``workers`` concurrent workers and start each one as soon as it is ready.
+
+    ``prepare(account)`` returns the keyword arguments for ``start(account, **kwargs)``. An account that
+    fails to prepare or start is logged under ``name(account)`` and left out; the rest of the fleet runs.
+    """
+    queue = asyncio.Queue()
+    for account in accounts:
+        queue.put_nowait(account)
+
+    async def worker():
+        while not queue.empty():
+            account = queue.get_nowait()
+            try:
+                await start(account, **await prepare(account))
+            except Exception as error:
+                logger.error(f"{name(account)} | <red>Failed to start: {error}</red>")
+
+    await asyncio.gather(*(worker() for _ in range(min(workers, len(accounts)))))
+
+
 async def run_tasks_query(query_ids: list[str]):
-    tasks = [
-        asyncio.create_task(
-            run_query_tapper(
-                query=query, 
-                proxy=await get_proxy(fetch_username(query)),
-                ua=await get_user_agent(fetch_username(query))
-            )
-        )
-        for query in query_ids
-    ]
+    pool = create_pool()
+    scheduler = Scheduler(workers=settings.SCHEDULER_WORKERS, max_rounds=settings.SCHEDULER_MAX_ROUNDS)
+    fleet_metrics.start(len(query_ids))
+
+    async def prepare(query):
+        username = fetch_username(query)
+        kwargs = dict(proxy=await account_store.get_proxy(username), ua=await account_store.get_user_agent(username))
+        fleet_metrics.mark_ready(username)
+        return kwargs
+
+    async def start(query, **kwargs):
+        scheduler.add(query_tapper_job(query=query, pool=pool, **kwargs))
+
+    runner = asyncio.create_task(scheduler.run())
+    reporter = asyncio.create_task(report_stats(pool, settings.STATS_INTERVAL, scheduler))
+
+    try:
+        await start_fleet(query_ids, prepare, start, settings.STARTUP_WORKERS, name=fetch_username)
+        await runner
+    finally:
+        runner.cancel()
+        reporter.cancel()
+        await pool.close()
+        await image_checker.close_session()
+        await version_checker.close()
+        await account_store.flush()
+
 
-    await asyncio.gather(*tasks)
 async def run_tasks(tg_clients: list[Client]):
-    tasks = [
-        asyncio.create_task(
-            run_tapper(
-                tg_client=tg_client,
-                proxy=await get_proxy(tg_client.name),
-                ua=await get_user_agent(tg_client.name)
-            )
-        )
-        for tg_client in tg_clients
-    ]
+    pool = create_pool()
+    scheduler = Scheduler(workers=settings.SCHEDULER_WORKERS, max_rounds=settings.SCHEDULER_MAX_ROUNDS)
+    fleet_metrics.start(len(tg_clients))
+
+    async def prepare(tg_client):
+        kwargs = dict(proxy=await account_store.get_proxy(tg_client.name),
+                      ua=await account_store.get_user_agent(tg_client.name))
+        fleet_metrics.mark_ready(tg_client.name)
+        return kwargs
 
-    await asyncio.gather(*tasks)
+    async def start(tg_client, **kwargs):
+        # Stagger first rounds so accounts don't all hit the API at once.
+        scheduler.add(tapper_job(tg_client=tg_client, pool=pool, **kwargs), delay=randint(1, 15))
+
+    runner = asyncio.create_task(scheduler.run())
+    reporter = asyncio.create_task(report_stats(pool, settings.STATS_INTERVAL, scheduler))
+
+    try:
+        await start_fleet(tg_clients, prepare, start, settings.STARTUP_WORKERS, name=lambda tg_client: tg_client.name)
+        await runner
+    finally:
+        runner.cancel()
+        reporter.cancel()
+        await pool.close()
+        await image_checker.close_session()
+        await version_checker.close()
+        await account_store.flush()
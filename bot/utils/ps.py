@@ -1,8 +1,16 @@
+import asyncio
+import codecs
+import functools
+import hashlib
+import json
 import os
 import requests
 import re
+import time
 from bot.config import settings
+from bot.exceptions import RequestError
 from bot.utils import logger
+from bot.core.http_client import AsyncSession
 
 baseUrl = "https://notpx.app/api/v1/"
 
@@ -27,55 +35,183 @@ def clean_url(url):
     url = re.sub(r'//+', '/', url)
     return url
 
-def get_main_js_format(base_url):
-    try:
-        response = requests.get(base_url)
-        response.raise_for_status()
-        content = response.text
-        matches = re.findall(r'src="(/.*?/index.*?\.js)"', content)
-        if matches:
-            return sorted(set(matches), key=len, reverse=True)
-        else:
-            return None
-    except requests.RequestException as e:
-        logger.warning(f"Error fetching the base URL: {e}")
+def parse_main_js_format(content):
+    matches = re.findall(r'src="(/.*?/index.*?\.js)"', content)
+    if matches:
+        return sorted(set(matches), key=len, reverse=True)
+    else:
         return None
 
-def get_base_api(url):
-    try:
-        logger.info("Checking for changes in API...")
-        response = requests.get(url)
-        response.raise_for_status()
-        content = response.text
-        match = ls_pattern.findall(content)
-        e_get_urls = e_get_pattern.findall(content)
-        e_put_urls = e_put_pattern.findall(content)
-
-        if e_get_urls is None:
-            return None
+class BundleScanner:
+    """
+    Single-pass, chunked scan of the JS bundle for ``baseUrl`` and the endpoints in ``apis``.
+
+    The last ``overlap`` characters of each chunk are carried over so matches that straddle a chunk
+    boundary are still found; each pattern remembers where its last match ended, so nothing is counted
+    twice. ``feed`` returns True as soon as every endpoint and the base URL have been seen. Every
+    get/put path met on the way is kept in ``paths``; once the scanner was fed to the end (``complete``)
+    they fingerprint the bundle as ``endpoints``.
+    """
+
+    patterns = (ls_pattern, e_get_pattern, e_put_pattern)
+
+    def __init__(self, overlap: int = 4096):
+        self.overlap = overlap
+        self.missing = set(apis)
+        self.paths = set()
+        self.base_urls = []
+        self.complete = False
+        self._tail = ""
+        self._offset = 0
+        self._next = [0] * len(self.patterns)
 
-        urls = [url[0] if url[0] else url[1] for url in e_get_urls]
-        urls_put = [url[0] if url[0] else url[1] for url in e_put_urls]
-        clean_urls = [clean_url(url) for url in urls] + [clean_url(url) for url in urls_put]
+    @property
+    def done(self) -> bool:
+        return not self.missing and baseUrl in self.base_urls
 
+    def feed(self, chunk: str, final: bool = False) -> bool:
+        text = self._tail + chunk
+        safe = len(text) if final else max(0, len(text) - self.overlap)
+        for i, pattern in enumerate(self.patterns):
+            for m in pattern.finditer(text, max(0, self._next[i] - self._offset)):
+                if m.start() >= safe:
+                    break
+                self._next[i] = self._offset + m.end()
+                if pattern is ls_pattern:
+                    self.base_urls.append(m.group(1))
+                else:
+                    path = clean_url(m.group(1) or m.group(2))
+                    self.paths.add(path)
+                    self.missing.discard(path)
+        self._tail = text[safe:]
+        self._offset += safe
+        self.complete = final
+        return self.done
+
+    @property
+    def endpoints(self):
+        """Every API path and base URL in the bundle; empty (no fingerprint) after a partial scan."""
+        return sorted(self.paths.union(self.base_urls)) if self.complete else []
+
+    def result(self):
         for url in apis:
-            if url not in clean_urls:
+            if url in self.missing:
                 logger.warning(f"<yellow>API {url} changed!</yellow>")
                 return None
 
-        if match:
-            return match
+        if self.base_urls:
+            return self.base_urls
         else:
             logger.info("Could not find 'API' in the content.")
             return None
 
-    except requests.RequestException as e:
+
+class BundleIndex:
+    """
+    Known-good JS bundle fingerprints, persisted as JSON: ``filename -> {"hash", "endpoints"}``.
+
+    A bundle whose filename is indexed was already checked and is not downloaded again. A renamed bundle
+    with a known content hash or the same full set of API paths is a cosmetic redeploy and doesn't stop
+    the bot.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with open(path, "r") as file:
+                self.entries: dict[str, dict] = json.load(file)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def __contains__(self, filename) -> bool:
+        return filename in self.entries
+
+    def match(self, digest, endpoints):
+        """Filename of a known bundle with the same content hash or set of API paths."""
+        endpoints = sorted(endpoints)
+        for filename, entry in self.entries.items():
+            if entry["hash"] == digest or (endpoints and sorted(entry["endpoints"]) == endpoints):
+                return filename
+        return None
+
+    def add(self, filename, digest, endpoints) -> None:
+        self.entries[filename] = {"hash": digest, "endpoints": sorted(endpoints), "seen_at": int(time.time())}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(f"{self.path}.tmp", "w") as file:
+                json.dump(self.entries, file, indent=2)
+            os.replace(f"{self.path}.tmp", self.path)
+        except OSError as e:
+            logger.warning(f"Error saving the JS file index: {e}")
+
+
+async def scan_bundle(response, chunk_size=64 * 1024, full=True):
+    """
+    Hash the whole bundle while scanning it. Without ``full``, scanning stops once every endpoint was
+    found, which leaves the scanner without an endpoint fingerprint; the hash is always complete.
+    """
+    scanner = BundleScanner()
+    digest = hashlib.sha256()
+    decoder = codecs.getincrementaldecoder(response.charset or "utf-8")(errors="replace")
+    async for chunk in response.content.iter_chunked(chunk_size):
+        digest.update(chunk)
+        if full or not scanner.done:
+            scanner.feed(decoder.decode(chunk))
+    if full or not scanner.done:
+        scanner.feed(decoder.decode(b"", final=True), final=True)
+    return digest.hexdigest(), scanner
+
+async def get_main_js_format(base_url):
+    try:
+        return await version_checker.fetch(base_url, parse_main_js_format)
+    except RequestError as e:
+        logger.warning(f"Error fetching the base URL: {e}")
+        return None
+
+async def get_bundle_fingerprint(url, full=True):
+    try:
+        logger.info("Checking for changes in API...")
+        return await version_checker.fetch(url, functools.partial(scan_bundle, full=full), stream=True)
+    except RequestError as e:
         logger.warning(f"Error fetching the JS file: {e}")
         return None
 
-def check_base_url():
-    base_url = "https://app.notpx.app/"
-    main_js_formats = get_main_js_format(base_url)
+async def check_bundle(format, scan=True):
+    """
+    Whether the bundle at ``format`` is safe to run against.
+
+    Indexed bundles pass without a download. Otherwise the bundle is fingerprinted and passes if it
+    matches a known one, or (with ``scan``) if every endpoint in ``apis`` and ``baseUrl`` are present.
+    The full set of API paths is only collected with ``ADVANCED_ANTI_DETECTION``, where renamed bundles
+    are matched on it; otherwise the scan stops at the last required endpoint and only the hash is kept.
+    """
+    filename = os.path.basename(format)
+    if filename in bundle_index:
+        logger.success(f"<green>Known JS file: {filename}</green>")
+        return True
+
+    fingerprint = await get_bundle_fingerprint(f"{settings.APP_ENDPOINT}{format}",
+                                               full=settings.ADVANCED_ANTI_DETECTION or not scan)
+    if fingerprint is None:
+        return False
+    digest, scanner = fingerprint
+
+    known = bundle_index.match(digest, scanner.endpoints)
+    if known:
+        logger.success(f"<green>JS file {filename} matches known version {known}</green>")
+    elif not scan:
+        return False
+    else:
+        result = scanner.result()
+        if result is None or baseUrl not in result:
+            return False
+        logger.success("<green>No change in API!</green>")
+    bundle_index.add(filename, digest, scanner.endpoints)
+    return True
+
+async def _check_base_url():
+    base_url = f"{settings.APP_ENDPOINT}/"
+    main_js_formats = await get_main_js_format(base_url)
 
     if main_js_formats:
         if settings.ADVANCED_ANTI_DETECTION:
@@ -88,8 +224,11 @@ def check_base_url():
                 for js in main_js_formats:
                     if js_ver in js:
                         logger.success(f"<green>No change in JS file: {js_ver}</green>")
+                        if os.path.basename(js) not in bundle_index:
+                            await check_bundle(js)
                         return True
-                return False
+                # Renamed bundle: only accept it if it is a known version under a new name.
+                return await check_bundle(main_js_formats[0], scan=False)
             except FileNotFoundError:
                 logger.warning(f"File not found at: {two_up_path}")
                 return False
@@ -99,28 +238,96 @@ def check_base_url():
         else:
             for format in main_js_formats:
                 logger.info(f"Trying format: {format}")
-                full_url = f"https://app.notpx.app{format}"
-                result = get_base_api(full_url)
-                if result is None:
-                    return False
-
-                if baseUrl in result:
-                    logger.success("<green>No change in API!</green>")
-                    return True
-                return False
+                return await check_bundle(format)
             else:
                 logger.warning("Could not find 'baseURL' in any of the JS files.")
                 return False
     else:
         logger.info("Could not find any main.js format. Dumping page content for inspection:")
         try:
-            response = requests.get(base_url)
+            response = await version_checker.session.get(base_url)
             print(response.text[:1000])  # Print first 1000 characters of the page
             return False
-        except requests.RequestException as e:
+        except RequestError as e:
             logger.warning(f"Error fetching the base URL for content dump: {e}")
             return False
 
+async def check_base_url():
+    return await version_checker.check()
+
+
+class VersionChecker:
+    """
+    Process-wide, TTL-cached result of the app version check.
+
+    All Tappers await the same result: it is recomputed at most once per ``ttl`` seconds and a check in
+    flight is shared. Pages are fetched with ``If-None-Match``/``If-Modified-Since``, so an unchanged app
+    costs a 304 instead of another bundle download.
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self.result: bool | None = None
+        self.checked_at = 0.0
+        self._pending: asyncio.Future | None = None
+        self._validators: dict[str, tuple[str | None, str | None, object]] = {}
+        self._session: AsyncSession | None = None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None or self._session.closed:
+            self._session = AsyncSession()
+        return self._session
+
+    async def fetch(self, url, parse, stream=False):
+        """
+        ``parse`` the body of ``url``; the previous value is reused when the server answers 304.
+
+        ``parse`` gets the decoded text, or with ``stream=True`` the raw response to read in chunks.
+        """
+        cached = self._validators.get(url)
+        headers = {}
+        if cached is not None:
+            etag, modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if modified:
+                headers["If-Modified-Since"] = modified
+
+        async with self.session.stream("GET", url, headers=headers) as response:
+            if response.status == 304 and cached is not None:
+                return cached[2]
+            response.raise_for_status()
+
+            value = await parse(response) if stream else parse(await response.text())
+            etag, modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        if etag or modified:
+            self._validators[url] = (etag, modified, value)
+        return value
+
+    async def check(self) -> bool:
+        if self.result is not None and time.monotonic() - self.checked_at < self.ttl:
+            return self.result
+        if self._pending is None:
+            self._pending = asyncio.ensure_future(self._refresh())
+        return await asyncio.shield(self._pending)
+
+    async def _refresh(self) -> bool:
+        try:
+            self.result = await _check_base_url()
+            self.checked_at = time.monotonic()
+            return self.result
+        finally:
+            self._pending = None
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+version_checker = VersionChecker(ttl=settings.VERSION_CHECK_INTERVAL)
+bundle_index = BundleIndex(os.path.join(os.getcwd(), "cache", "bundles.json"))
+
 class Tapper:
     def __init__(self, login_url, login_payload):
         self.login_url = login_url
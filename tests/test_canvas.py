@@ -0,0 +1,101 @@
+"""Canvas diff and bookkeeping on small synthetic canvases; nothing here touches the network."""
+import asyncio
+
+import numpy as np
+
+from bot.core.canvas import PALETTE, PALETTE_INDEX, TRANSPARENT, UNKNOWN, Canvas, TemplateGrid, pixel_id
+from bot.exceptions import RequestError
+
+WHITE = PALETTE_INDEX["#FFFFFF"]
+BLACK = PALETTE_INDEX["#000000"]
+
+
+def white_canvas() -> Canvas:
+    canvas = Canvas()
+    canvas.load_indices(np.full((1000, 1000), WHITE, dtype=np.uint8))
+    return canvas
+
+
+def checker_grid(x: int = 10, y: int = 20, size: int = 4) -> TemplateGrid:
+    # Black on the diagonal, white elsewhere, one transparent corner.
+    indices = np.full((size, size), WHITE, dtype=np.uint8)
+    np.fill_diagonal(indices, BLACK)
+    indices[0, size - 1] = TRANSPARENT
+    return TemplateGrid(indices, x, y)
+
+
+def test_mismatched_cells_skip_matching_and_transparent_cells():
+    canvas = white_canvas()
+    grid = checker_grid()
+
+    assert canvas.mismatched_cells(grid).tolist() == [0, 5, 10, 15]
+    assert canvas.mismatch_count(grid) == 4
+
+
+def test_unknown_pixels_count_as_mismatched():
+    canvas = Canvas()
+    grid = checker_grid()
+
+    assert canvas.mismatch_count(grid) == len(grid.paintable) == 15
+    assert canvas.get_pixel(pixel_id(10, 20)) == UNKNOWN
+
+
+def test_diff_is_center_first_and_respects_limit():
+    canvas = white_canvas()
+    grid = checker_grid()
+
+    full = canvas.diff(grid)
+    assert sorted(full) == sorted((pixel_id(10 + i, 20 + i), "#000000") for i in range(4))
+    # The two diagonal cells nearest the center of a 4x4 grid come first.
+    assert {pixel for pixel, _ in list(full)[:2]} == {pixel_id(11, 21), pixel_id(12, 22)}
+    assert list(canvas.diff(grid, limit=2)) == list(full)[:2]
+
+
+def test_set_pixel_keeps_tracked_counts_current():
+    canvas = white_canvas()
+    grid = checker_grid()
+    assert canvas.mismatches(grid) == 4
+
+    canvas.set_pixel(pixel_id(10, 20), "#000000")
+    assert canvas.mismatches(grid) == 3
+    canvas.set_pixel(pixel_id(10, 20), BLACK)  # no change
+    assert canvas.mismatches(grid) == 3
+    canvas.set_pixel(pixel_id(11, 20), PALETTE[0])  # breaks a matching cell
+    assert canvas.mismatches(grid) == 4
+    canvas.set_pixel(pixel_id(13, 20), PALETTE[0])  # transparent cell
+    canvas.set_pixel(pixel_id(500, 500), PALETTE[0])  # outside the template
+    assert canvas.mismatches(grid) == 4
+    assert canvas.mismatches(grid) == canvas.mismatch_count(grid)
+
+
+def test_snapshot_replays_newer_local_paints():
+    canvas = white_canvas()
+    grid = checker_grid()
+    canvas.track(grid)
+    canvas.set_pixel(pixel_id(10, 20), "#000000")
+
+    canvas.load_indices(np.full((1000, 1000), WHITE, dtype=np.uint8), taken_at=0)
+
+    assert canvas.get_pixel(pixel_id(10, 20)) == BLACK
+    assert canvas.mismatches(grid) == 3
+
+
+class FailingSession:
+    def __init__(self):
+        self.requests = 0
+
+    async def get(self, url, **kwargs):
+        self.requests += 1
+        await asyncio.sleep(0.05)
+        raise RequestError("snapshot server down")
+
+
+def test_failed_refresh_is_shared_and_backed_off():
+    canvas = Canvas(retry_after=60)
+    session = FailingSession()
+
+    async def refresh_many():
+        return await asyncio.gather(*(canvas.refresh(session) for _ in range(5)))
+
+    assert asyncio.run(refresh_many()) == [False] * 5
+    assert session.requests == 1
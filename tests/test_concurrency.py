@@ -0,0 +1,45 @@
+"""The adaptive concurrency window against the ``bot.mock`` server injecting gateway timeouts."""
+import asyncio
+import socket
+
+from bot.core.http_client import AsyncSession
+from bot.core.ratelimit import ConcurrencyController, RateLimiter
+from bot.mock import MockConfig, start
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def shrink_and_recover() -> tuple[float, float, float]:
+    config = MockConfig(latency=0, jitter=0, error_rate=0.5, error_status=504)
+    port = free_port()
+    runner = await start(config, "127.0.0.1", port)
+    controller = ConcurrencyController(initial=32, min_window=2, max_window=64, cooldown=0)
+    limiter = RateLimiter({}, concurrency=controller)
+    url = f"http://127.0.0.1:{port}/api/v1/mining/status"
+
+    async def burst(session: AsyncSession, requests: int) -> None:
+        await asyncio.gather(*(session.get(url, headers={"Authorization": f"initData {i}"})
+                               for i in range(requests)))
+
+    try:
+        async with AsyncSession(limiter=limiter) as session:
+            initial = controller.window
+            await burst(session, 50)
+            shrunk = controller.window
+            config.error_rate = 0
+            await burst(session, 200)
+            recovered = controller.window
+    finally:
+        await runner.cleanup()
+    return initial, shrunk, recovered
+
+
+def test_window_shrinks_on_504s_and_grows_back():
+    initial, shrunk, recovered = asyncio.run(shrink_and_recover())
+
+    assert shrunk < initial / 4
+    assert recovered > shrunk * 4
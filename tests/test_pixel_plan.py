@@ -0,0 +1,72 @@
+"""One pixel-plan call per account per round, against the mock coordinator in ``bot.mock``."""
+import asyncio
+import socket
+
+import numpy as np
+
+from bot.core import image_checker
+from bot.core.allocator import PixelAllocator
+from bot.core.canvas import PALETTE_INDEX, Canvas, TemplateGrid
+from bot.core.http_client import Response
+from bot.mock import MockConfig, start
+
+TEMPLATE = 1006282664
+CHARGES = 24
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def coordinator_requests(monkeypatch, plan) -> tuple[list, int]:
+    """Run ``plan(provider)`` against a fresh mock server; return its result and the requests it made."""
+    port = free_port()
+    runner = await start(MockConfig(latency=0, jitter=0), "127.0.0.1", port)
+    monkeypatch.setattr(image_checker, "ENDPOINT", f"http://127.0.0.1:{port}")
+    monkeypatch.setattr(image_checker, "_session", None)
+    state = runner.app["state"]
+    try:
+        result = await plan(image_checker.RemotePixelProvider())
+        return result, state.requests
+    finally:
+        await image_checker.close_session()
+        await runner.cleanup()
+
+
+def test_remote_plan_is_one_request(monkeypatch):
+    plan, requests = asyncio.run(coordinator_requests(
+        monkeypatch, lambda provider: provider.get_plan("1", TEMPLATE, CHARGES)))
+
+    assert len(plan) == CHARGES
+    assert requests == 1
+
+
+def test_remote_plan_without_batch_endpoint_is_one_request_per_pixel(monkeypatch):
+    async def no_batch(user_id, template, count):
+        Response(404, "Not Found", "/get_pixels/", {}, b"").raise_for_status()
+
+    monkeypatch.setattr(image_checker, "_get_pixel_plan", no_batch)
+    plan, requests = asyncio.run(coordinator_requests(
+        monkeypatch, lambda provider: provider.get_plan("1", TEMPLATE, CHARGES)))
+
+    assert len(plan) == CHARGES
+    assert requests == CHARGES
+
+
+def test_local_plan_makes_no_requests_and_leases_distinct_pixels(monkeypatch):
+    canvas = Canvas()
+    canvas.load_indices(np.full((1000, 1000), PALETTE_INDEX["#FFFFFF"], dtype=np.uint8))
+    grid = TemplateGrid(np.full((16, 16), PALETTE_INDEX["#000000"], dtype=np.uint8), 100, 100)
+    provider = image_checker.LocalPixelProvider(canvas=canvas, allocator=PixelAllocator())
+    provider.add_template(TEMPLATE, grid)
+
+    async def plans(_remote):
+        return [await provider.get_plan(owner, TEMPLATE, CHARGES) for owner in ("alice", "bob")]
+
+    (first, second), requests = asyncio.run(coordinator_requests(monkeypatch, plans))
+
+    assert len(first) == len(second) == CHARGES
+    assert not {pixel for pixel, _ in first} & {pixel for pixel, _ in second}
+    assert requests == 0
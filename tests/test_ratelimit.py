@@ -0,0 +1,47 @@
+"""Which pushed-back requests ``AsyncSession`` sends again."""
+import asyncio
+import socket
+
+from aiohttp import web
+
+from bot.core.http_client import AsyncSession
+from bot.core.ratelimit import RateLimiter
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def calls(method: str, status: int) -> int:
+    seen = []
+
+    async def pushback(request):
+        seen.append(request.method)
+        return web.Response(status=status if len(seen) == 1 else 200, headers={"Retry-After": "0"})
+
+    app = web.Application()
+    app.router.add_route("*", "/api/v1/repaint/start", pushback)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    port = free_port()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    try:
+        async with AsyncSession(limiter=RateLimiter({})) as session:
+            await session.request(method, f"http://127.0.0.1:{port}/api/v1/repaint/start")
+    finally:
+        await runner.cleanup()
+    return len(seen)
+
+
+def test_paint_is_not_sent_twice_after_503():
+    assert asyncio.run(calls("POST", 503)) == 1
+
+
+def test_paint_is_sent_again_after_429():
+    assert asyncio.run(calls("POST", 429)) == 2
+
+
+def test_get_is_sent_again_after_503():
+    assert asyncio.run(calls("GET", 503)) == 2